@@ -0,0 +1,397 @@
+"""Бенчмарки локальных путей данных инвайтера (без сети и без аккаунта Telegram).
+
+Запуск из корня репозитория:
+
+    python benchmarks/run_benchmarks.py                  # наборы от 1k до 1M строк
+    python benchmarks/run_benchmarks.py --quick          # только 1k и 10k
+    python benchmarks/run_benchmarks.py --cases db_add_users import_csv
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/20260101_120000.json
+
+Результаты сохраняются в JSON (по умолчанию benchmarks/results/<время>.json),
+при --compare сравниваются с предыдущим прогоном; замедление больше порога
+считается регрессией и дает код выхода 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+QUICK_SIZES = [1000, 10000]
+
+sys.path.insert(0, ROOT)
+# Виджеты создаются без дисплея
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import invite_gui  # noqa: E402
+
+
+class Skip(Exception):
+    """Кейс не может быть выполнен в этом окружении (нет зависимости и т.п.)"""
+
+
+def usernames(count, prefix='user'):
+    return [f"{prefix}{i:07d}" for i in range(count)]
+
+
+def new_db(workdir, name='users.db'):
+    return invite_gui.UserDatabase(os.path.join(workdir, name))
+
+
+def make_external_db(path, count):
+    """База другого экземпляра программы со списком ожидающих пользователей"""
+    db = invite_gui.UserDatabase(path)
+    db.add_users('@' + name for name in usernames(count, 'ext'))
+    db.close()
+
+
+def get_qt_app():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+# Каждый кейс: подготовка вне замера, возвращает функцию, время работы которой измеряется
+
+def case_db_add_users(size, workdir):
+    db = new_db(workdir)
+    names = usernames(size)
+    return lambda: db.add_users(names)
+
+
+def case_db_update_statuses(size, workdir):
+    db = new_db(workdir)
+    names = usernames(size)
+    db.add_users(names)
+    return lambda: db.update_statuses((name, 'invited') for name in names)
+
+
+def case_db_query_pending(size, workdir):
+    db = new_db(workdir)
+    names = usernames(size)
+    db.add_users(names)
+    db.update_statuses((name, 'invited') for name in names[::2])
+
+    def run():
+        db.count_users('pending')
+        for _ in db.iter_users_by_status('pending'):
+            pass
+    return run
+
+
+def case_db_users_page(size, workdir):
+    db = new_db(workdir)
+    db.add_users(usernames(size))
+    get_qt_app()
+    rows = [random.Random(i).randrange(size) for i in range(20)]
+
+    def run():
+        # Как в интерфейсе: прыжок к случайной позиции и прокрутка на 5 страниц вниз
+        model = invite_gui.UserListModel(db)
+        model.set_status_filter('pending')
+        for row in rows:
+            for page in range(5):
+                model.data(model.index(min(row + page * model.page_size, size - 1)))
+    return run
+
+
+def case_import_csv(size, workdir):
+    path = os.path.join(workdir, 'users.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('id,username\n')
+        for i, name in enumerate(usernames(size)):
+            f.write(f"{i},@{name}\n")
+    db = new_db(workdir)
+    return lambda: invite_gui.ImportWorker(db, path).run()
+
+
+def case_import_xlsx(size, workdir):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise Skip("openpyxl не установлен")
+    path = os.path.join(workdir, 'users.xlsx')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['id', 'username'])
+    for i, name in enumerate(usernames(size)):
+        sheet.append([i, name])
+    workbook.save(path)
+    db = new_db(workdir)
+    return lambda: invite_gui.ImportWorker(db, path).run()
+
+
+def case_export_xlsx(size, workdir):
+    try:
+        invite_gui.lazy_import('openpyxl')
+    except ImportError:
+        raise Skip("openpyxl не установлен")
+    db = new_db(workdir)
+    db.add_users(usernames(size))
+    path = os.path.join(workdir, 'export.xlsx')
+    return lambda: invite_gui.ExportWorker(db, path).run()
+
+
+def case_export_csv(size, workdir):
+    db = new_db(workdir)
+    db.add_users(usernames(size))
+    path = os.path.join(workdir, 'export.csv')
+    return lambda: invite_gui.ExportWorker(db, path).run()
+
+
+def case_load_users_from_db(size, workdir):
+    external = os.path.join(workdir, 'external.db')
+    make_external_db(external, size)
+    db = new_db(workdir)
+    return lambda: db.merge_from(external)
+
+
+def case_participant_filter(size, workdir):
+    participants = [(i, f"member{i}") for i in range(size)]
+    candidates = [f"@Member{i}" for i in range(0, 2 * size, 2)] + [str(i) for i in range(size // 2)]
+
+    def run():
+        index = invite_gui.ParticipantIndex()
+        for user_id, username in participants:
+            index.add(user_id, username)
+        return sum(1 for user in candidates if user in index)
+    return run
+
+
+def case_normalize_usernames(size, workdir):
+    forms = ['@User{}', 'user{}', 'https://t.me/user{}', '{}', 't.me/+invite{}']
+    values = [forms[i % len(forms)].format(i // 2) for i in range(size)]
+
+    def run():
+        normalizer = invite_gui.UsernameNormalizer()
+        return sum(len(normalizer.normalize_many(values[start:start + 5000]))
+                   for start in range(0, size, 5000))
+    return run
+
+
+def case_invite_runner_fake(size, workdir):
+    db = new_db(workdir)
+    db.add_users(usernames(size))
+    fixtures = {
+        'channels': {'benchmark': 1},
+        'participants': [(i, name) for i, name in enumerate(usernames(size)[::3])]
+    }
+
+    def run():
+        pool = invite_gui.FakeClientPool(fixtures)
+        runner = invite_gui.InviteRunner(
+            1, 'hash', 'bench', '@benchmark', db,
+            session_file=os.path.join(workdir, 'bench'),
+            client_pool=pool, sleep=pool.sleep
+        )
+        runner.run()
+    return run
+
+
+def case_log_view_append(size, workdir):
+    app = get_qt_app()
+    view = invite_gui.LogView(os.path.join(workdir, 'bench.log'))
+    messages = [f"[12:00:00] ❌ Ошибка при инвайте пользователя user{i}: USER_PRIVACY_RESTRICTED"
+                for i in range(size)]
+
+    def run():
+        # Сообщения приходят пачками, как из worker'а, между пачками отрабатывает цикл событий
+        for start in range(0, size, 100):
+            for message in messages[start:start + 100]:
+                view.append(message)
+            view.flush()
+            app.processEvents()
+    return run
+
+
+COLD_START_SCRIPT = '''
+import sys, time
+sys.path.insert(0, {root!r})
+import invite_gui
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+window = invite_gui.MainWindow()
+window.show()
+deadline = time.time() + 30
+while not window.first_paint_done and time.time() < deadline:
+    app.processEvents()
+window.close()
+'''
+
+
+def case_cold_start(size, workdir):
+    script = COLD_START_SCRIPT.format(root=ROOT)
+    env = dict(os.environ, INVITER_STARTUP_PROFILE='1')
+
+    def run():
+        subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return run
+
+
+def cold_start_details(workdir):
+    path = os.path.join(workdir, 'logs', 'startup_profile.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+# name -> (функция, максимальный размер или None, зависит ли от размера)
+CASES = {
+    'db_add_users': (case_db_add_users, None, True),
+    'db_update_statuses': (case_db_update_statuses, None, True),
+    'db_query_pending': (case_db_query_pending, None, True),
+    'db_users_page': (case_db_users_page, None, True),
+    'import_csv': (case_import_csv, None, True),
+    'import_xlsx': (case_import_xlsx, 100000, True),
+    'export_xlsx': (case_export_xlsx, 100000, True),
+    'export_csv': (case_export_csv, None, True),
+    'load_users_from_db': (case_load_users_from_db, None, True),
+    'participant_filter': (case_participant_filter, None, True),
+    'normalize_usernames': (case_normalize_usernames, None, True),
+    'invite_runner_fake': (case_invite_runner_fake, 100000, True),
+    'log_view_append': (case_log_view_append, 100000, True),
+    'cold_start': (case_cold_start, None, False),
+}
+
+
+def measure(case_name, size, repeat, track_memory):
+    """Лучшее время из repeat запусков, каждый в чистой временной папке"""
+    func = CASES[case_name][0]
+    timings = []
+    peak_mb = None
+    details = None
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix='inviter_bench_')
+        try:
+            run = func(size, workdir)
+            if track_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+            if track_memory:
+                peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+                peak_mb = max(peak_mb or 0, round(peak, 2))
+            if case_name == 'cold_start':
+                details = cold_start_details(workdir)
+        finally:
+            # Закрываем соединения SQLite до удаления папки
+            gc.collect()
+            shutil.rmtree(workdir, ignore_errors=True)
+    result = {
+        'case': case_name,
+        'size': size,
+        'seconds': round(min(timings), 6),
+        'runs': [round(t, 6) for t in timings],
+    }
+    if size:
+        result['rows_per_second'] = round(size / min(timings), 1) if min(timings) else None
+    if peak_mb is not None:
+        result['peak_mb'] = peak_mb
+    if details:
+        result['startup_profile'] = details
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Сравнение с предыдущим прогоном, возвращает список регрессий"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(item['case'], item.get('size')): item for item in baseline.get('results', [])
+                if 'seconds' in item}
+    regressions = []
+    print(f"\nСравнение с {baseline_path} (ревизия {baseline.get('meta', {}).get('git_revision')}):")
+    for item in results:
+        old = previous.get((item['case'], item.get('size')))
+        if not old or 'seconds' not in item:
+            continue
+        ratio = item['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = '  <-- регрессия'
+            regressions.append({**item, 'baseline_seconds': old['seconds'], 'ratio': round(ratio, 3)})
+        print(f"  {item['case']:<22} {str(item.get('size')):>8}  {old['seconds']:>10.4f}s -> "
+              f"{item['seconds']:>10.4f}s  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки локальных путей данных инвайтера")
+    parser.add_argument('--sizes', type=int, nargs='+', help="размеры наборов данных (по умолчанию 1k..1M)")
+    parser.add_argument('--quick', action='store_true', help="только 1k и 10k строк")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help="запустить только выбранные кейсы")
+    parser.add_argument('--repeat', type=int, default=3, help="количество повторов, берется лучшее время")
+    parser.add_argument('--memory', action='store_true', help="замерять пиковую память через tracemalloc (медленнее)")
+    parser.add_argument('--output', help="путь к JSON с результатами")
+    parser.add_argument('--compare', help="JSON предыдущего прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2, help="допустимое замедление при сравнении (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    case_names = args.cases or list(CASES)
+
+    results = []
+    for case_name in case_names:
+        _, max_size, sized = CASES[case_name]
+        case_sizes = [size for size in sizes if max_size is None or size <= max_size] if sized else [None]
+        for size in case_sizes:
+            label = f"{case_name} [{size}]" if size else case_name
+            try:
+                result = measure(case_name, size, args.repeat, args.memory)
+                print(f"{label:<40} {result['seconds']:>10.4f}s")
+            except Skip as e:
+                result = {'case': case_name, 'size': size, 'skipped': str(e)}
+                print(f"{label:<40} пропущен: {e}")
+            except Exception as e:
+                result = {'case': case_name, 'size': size, 'error': f"{type(e).__name__}: {e}"}
+                print(f"{label:<40} ошибка: {e}")
+            results.append(result)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"\nРезультаты сохранены в {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"Найдено регрессий: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,50 +1,458 @@
 # Telegram инвайтер через админку
 # Обновлено: Добавлена поддержка множественных сессий и улучшена обработка ошибок
+import time
+_START_TIME = time.perf_counter()
 import os
 import sys
 import json
 import asyncio
 import sqlite3
+import csv
+import re
 import shutil
-from datetime import datetime
-import pandas as pd
-from telethon import TelegramClient, errors
-from telethon.tl.functions.channels import GetParticipantsRequest
-from telethon.tl.types import ChannelParticipantsSearch
-from telethon.errors import SessionPasswordNeededError
+import threading
+import importlib
+import functools
+import math
+import tracemalloc
+import cProfile
+from contextlib import contextmanager
+import copy
+import tempfile
+import logging
+import logging.handlers
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict, Counter
+from types import SimpleNamespace
+import zlib
+_QT_IMPORT_START = time.perf_counter()
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QComboBox, QMessageBox,
-    QTabWidget, QTextEdit, QProgressBar, QScrollArea, QCheckBox,
-    QInputDialog, QFileDialog
+    QTabWidget, QProgressBar, QScrollArea, QCheckBox,
+    QInputDialog, QFileDialog, QPlainTextEdit, QListView,
+    QDialog, QDialogButtonBox, QFormLayout, QDateEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView
 )
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QObject, QThread, Signal, Slot, QTimer, Qt, QAbstractListModel, QModelIndex, QDate
+_QT_IMPORT_TIME = time.perf_counter() - _QT_IMPORT_START
 
-class TelegramWorker(QThread):
-    update_log = Signal(str)
-    update_progress = Signal(int)
-    auth_code_required = Signal()
-    password_required = Signal()
-    finished_signal = Signal(tuple)
+class StartupProfiler:
+    """Замер времени запуска (включается переменной окружения INVITER_STARTUP_PROFILE=1)"""
     
-    def __init__(self, api_id, api_hash, phone, channel_link, users, users_per_batch=10, batch_delay=300):
-        super().__init__()
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.imports = {}
+        self.marks = {}
+        self.reported = False
+    
+    def record_import(self, name, seconds):
+        if self.enabled:
+            self.imports[name] = seconds
+    
+    def mark(self, name):
+        if self.enabled and name not in self.marks:
+            self.marks[name] = time.perf_counter() - _START_TIME
+    
+    def report(self):
+        """Вывод отчета о запуске и сохранение его в logs/startup_profile.json"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        report = {
+            'imports_ms': {name: round(seconds * 1000, 2) for name, seconds in self.imports.items()},
+            'marks_ms': {name: round(seconds * 1000, 2) for name, seconds in self.marks.items()}
+        }
+        print("⏱️ Время запуска:", file=sys.stderr)
+        for name, ms in sorted(report['imports_ms'].items(), key=lambda item: -item[1]):
+            print(f"  import {name}: {ms} мс", file=sys.stderr)
+        for name, ms in report['marks_ms'].items():
+            print(f"  {name}: {ms} мс", file=sys.stderr)
+        try:
+            os.makedirs('logs', exist_ok=True)
+            with open(os.path.join('logs', 'startup_profile.json'), 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4, ensure_ascii=False)
+        except OSError as e:
+            print(f"❌ Не удалось сохранить отчет о запуске: {e}", file=sys.stderr)
+
+STARTUP = StartupProfiler(os.environ.get('INVITER_STARTUP_PROFILE') == '1')
+STARTUP.record_import('PySide6', _QT_IMPORT_TIME)
+
+def lazy_import(name):
+    """Импорт тяжелой зависимости при первом использовании (pandas, telethon)"""
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        STARTUP.record_import(name, time.perf_counter() - started)
+    return module
+
+def create_telegram_client(*args, **kwargs):
+    """Создание TelegramClient с отложенным импортом telethon"""
+    return lazy_import('telethon').TelegramClient(*args, **kwargs)
+
+class RunProfiler:
+    """Замер фаз работы (INVITER_PROFILE=1, с cProfile - INVITER_PROFILE=cprofile): интервалы, p50/p95, пик памяти"""
+    
+    def __init__(self, enabled=False, use_cprofile=False):
+        self.enabled = enabled
+        self.use_cprofile = use_cprofile
+        self.spans = {}
+        self.lock = threading.Lock()
+        self.run_name = None
+        self.run_started = None
+        self.profile = None
+        self.own_tracemalloc = False
+    
+    def record(self, name, seconds):
+        with self.lock:
+            self.spans.setdefault(name, []).append(seconds)
+    
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+    
+    def timed(self, name):
+        """Декоратор для обычных и async функций"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+            
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def start_run(self, name='invite'):
+        """Начало прогона; cProfile профилирует поток, в котором вызван этот метод"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.spans = {}
+        self.run_name = name
+        self.run_started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracemalloc = True
+        tracemalloc.reset_peak()
+        if self.use_cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+    
+    @staticmethod
+    def percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+    
+    def summary(self):
+        with self.lock:
+            spans = {name: list(values) for name, values in self.spans.items()}
+        return {
+            'run': self.run_name,
+            'wall_seconds': round(time.perf_counter() - self.run_started, 3) if self.run_started else None,
+            'peak_memory_mb': round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            if tracemalloc.is_tracing() else None,
+            'spans': {
+                name: {
+                    'count': len(values),
+                    'total_ms': round(sum(values) * 1000, 3),
+                    'p50_ms': round(self.percentile(values, 0.5) * 1000, 3),
+                    'p95_ms': round(self.percentile(values, 0.95) * 1000, 3),
+                    'max_ms': round(max(values) * 1000, 3)
+                }
+                for name, values in sorted(spans.items())
+            }
+        }
+    
+    def finish_run(self, directory='logs'):
+        """Завершение прогона: сводка в logs/run_profile_*.json и .prof для cProfile; возвращает сводку"""
+        if not self.enabled or self.run_started is None:
+            return None
+        if self.profile:
+            self.profile.disable()
+        summary = self.summary()
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        os.makedirs(directory, exist_ok=True)
+        if self.profile:
+            summary['cprofile'] = os.path.join(directory, f'run_profile_{stamp}.prof')
+            self.profile.dump_stats(summary['cprofile'])
+            self.profile = None
+        summary['path'] = os.path.join(directory, f'run_profile_{stamp}.json')
+        with open(summary['path'], 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        if self.own_tracemalloc:
+            tracemalloc.stop()
+            self.own_tracemalloc = False
+        self.run_started = None
+        return summary
+
+PROFILER = RunProfiler(
+    enabled=os.environ.get('INVITER_PROFILE', '') in ('1', 'cprofile'),
+    use_cprofile=os.environ.get('INVITER_PROFILE') == 'cprofile'
+)
+
+class TelegramLoopThread:
+    """Общий фоновый поток с event loop для всех операций Telegram и пулом подключенных клиентов"""
+    
+    def __init__(self, idle_timeout=300, idle_check_interval=30):
+        self.idle_timeout = idle_timeout
+        self.idle_check_interval = idle_check_interval
+        self.loop = None
+        self.thread = None
+        self.clients = {}
+        self.lock = threading.Lock()
+    
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run, name='telegram-loop', daemon=True)
+            self.thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        idle_task = self.loop.create_task(self._close_idle_clients())
+        self.loop.run_forever()
+        idle_task.cancel()
+        try:
+            self.loop.run_until_complete(idle_task)
+        except asyncio.CancelledError:
+            pass
+        self.loop.close()
+    
+    def submit(self, coro):
+        """Запуск корутины в общем loop, возвращает concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro, timeout=None):
+        """Запуск корутины и ожидание результата в вызывающем потоке"""
+        return self.submit(coro).result(timeout)
+    
+    async def acquire_client(self, session_file, api_id, api_hash):
+        """Подключенный клиент для сессии из пула (создается при первом обращении)"""
+        key = os.path.abspath(session_file)
+        entry = self.clients.get(key)
+        if entry and (entry['api_id'], entry['api_hash']) != (api_id, api_hash):
+            await self.drop_client(session_file)
+            entry = None
+        if entry is None:
+            entry = {
+                'client': create_telegram_client(session_file, api_id, api_hash),
+                'api_id': api_id,
+                'api_hash': api_hash,
+                'users': 0,
+                'last_used': time.monotonic(),
+                'connect_lock': asyncio.Lock()
+            }
+            self.clients[key] = entry
+        # Счетчик растет до connect, чтобы простой не закрыл клиента во время подключения
+        entry['users'] += 1
+        entry['last_used'] = time.monotonic()
+        try:
+            async with entry['connect_lock']:
+                if not entry['client'].is_connected():
+                    await entry['client'].connect()
+        except BaseException:
+            # Клиент вызывающему не достался - release_client не будет, возвращаем счетчик
+            entry['users'] = max(entry['users'] - 1, 0)
+            raise
+        return entry['client']
+    
+    async def release_client(self, client):
+        """Возврат клиента в пул; соединение закроется после простоя"""
+        for entry in self.clients.values():
+            if entry['client'] is client:
+                entry['users'] = max(entry['users'] - 1, 0)
+                entry['last_used'] = time.monotonic()
+                return
+    
+    async def drop_client(self, session_file):
+        """Отключение и удаление клиента из пула (перед удалением файлов сессии)"""
+        entry = self.clients.pop(os.path.abspath(session_file), None)
+        if entry and entry['client'].is_connected():
+            await entry['client'].disconnect()
+    
+    async def _close_idle_clients(self):
+        while True:
+            await asyncio.sleep(self.idle_check_interval)
+            now = time.monotonic()
+            for key, entry in list(self.clients.items()):
+                if entry['users'] == 0 and now - entry['last_used'] > self.idle_timeout:
+                    self.clients.pop(key, None)
+                    try:
+                        await entry['client'].disconnect()
+                    except Exception:
+                        pass
+    
+    async def _disconnect_all(self):
+        for key in list(self.clients):
+            entry = self.clients.pop(key)
+            try:
+                await entry['client'].disconnect()
+            except Exception:
+                pass
+    
+    def shutdown(self, timeout=5):
+        """Отключение всех клиентов и остановка потока"""
+        if not (self.thread and self.thread.is_alive()):
+            return
+        try:
+            self.run(self._disconnect_all(), timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+TELEGRAM_LOOP = TelegramLoopThread()
+# Предел ожидания одного сетевого шага (подключение, отправка кода, вход), секунд
+TELEGRAM_CALL_TIMEOUT = 60
+
+class TelegramCall(QObject):
+    """Корутина в TELEGRAM_LOOP без ожидания в потоке интерфейса: результат или ошибка
+    приходят сигналом и передаются колбэкам уже в потоке интерфейса"""
+    finished = Signal(object, object)
+    
+    def __init__(self, coro, on_result, on_error, timeout=TELEGRAM_CALL_TIMEOUT, parent=None):
+        # parent держит объект живым до ответа, после ответа он удаляется
+        super().__init__(parent)
+        self.on_result = on_result
+        self.on_error = on_error
+        self.timeout = timeout
+        self.finished.connect(self.deliver)
+        TELEGRAM_LOOP.submit(asyncio.wait_for(coro, timeout)).add_done_callback(self.emit_result)
+    
+    def emit_result(self, future):
+        # Вызывается в потоке loop, сигнал ставится в очередь потока интерфейса
+        try:
+            self.finished.emit(future.result(), None)
+        except BaseException as e:
+            self.finished.emit(None, e)
+    
+    @Slot(object, object)
+    def deliver(self, result, error):
+        self.deleteLater()
+        if error is None:
+            self.on_result(result)
+        elif isinstance(error, asyncio.TimeoutError):
+            self.on_error(TimeoutError(f"Telegram не ответил за {self.timeout} с"))
+        else:
+            self.on_error(error)
+
+class RunState:
+    """Состояние прогона инвайта: поток Telegram обновляет счетчики, интерфейс читает их по таймеру"""
+    
+    PHASES = {
+        'idle': "Ожидание",
+        'connecting': "Подключение к Telegram",
+        'participants': "Загрузка подписчиков",
+        'inviting': "Приглашение",
+        'batch_pause': "Пауза между партиями",
+        'stopping': "Остановка",
+        'finished': "Завершено"
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self, total=0):
+        with self.lock:
+            self.phase = 'idle'
+            self.phase_until = None
+            self.total = total
+            self.invited = 0
+            self.skipped = 0
+            self.failed = 0
+            self.started = time.monotonic()
+    
+    def set_phase(self, phase, duration=None):
+        with self.lock:
+            self.phase = phase
+            self.phase_until = time.monotonic() + duration if duration else None
+    
+    def set_total(self, total):
+        with self.lock:
+            self.total = total
+            self.started = time.monotonic()
+    
+    def count(self, outcome):
+        """Учет обработанного пользователя: outcome - 'invited', 'skipped' или 'failed'"""
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+    
+    def snapshot(self):
+        """Согласованная копия состояния с прогрессом и оценкой оставшегося времени"""
+        with self.lock:
+            now = time.monotonic()
+            processed = self.invited + self.skipped + self.failed
+            remaining = max(self.total - processed, 0)
+            # Паузы входят в прошедшее время, поэтому учитываются и в оценке
+            eta = (now - self.started) / processed * remaining if processed and remaining else None
+            return SimpleNamespace(
+                phase=self.phase,
+                phase_title=self.PHASES.get(self.phase, self.phase),
+                phase_left=max(self.phase_until - now, 0) if self.phase_until else None,
+                total=self.total,
+                processed=processed,
+                invited=self.invited,
+                skipped=self.skipped,
+                failed=self.failed,
+                progress=min(int(processed / self.total * 100), 100) if self.total else 0,
+                eta=eta
+            )
+
+class InviteRunner:
+    """Логика инвайта без Qt: клиент берется из пула, события передаются через callback'и"""
+    
+    def __init__(self, api_id, api_hash, phone, channel_link, db, users_per_batch=10, batch_delay=300,
+                 session_file=None, user_delay=4, client_pool=None, sleep=None,
+                 on_log=None, on_progress=None, on_session_validated=None, state=None):
         self.api_id = api_id
         self.api_hash = api_hash
         self.phone = phone
+        self.session_file = session_file or os.path.join('sessions', phone)
         self.channel_link = channel_link
-        self.users = users
+        self.db = db
         self.users_per_batch = users_per_batch
         self.batch_delay = batch_delay
+        self.user_delay = user_delay
+        # Пул клиентов: объект с корутинами acquire_client/release_client (TELEGRAM_LOOP или FakeClientPool)
+        self.client_pool = client_pool or TELEGRAM_LOOP
+        self.sleep = sleep or asyncio.sleep
+        self.log = on_log or (lambda message: None)
+        self.progress = on_progress or (lambda value: None)
+        self.validated = on_session_validated or (lambda ok, message: None)
+        # Счетчики и фаза для опроса интерфейсом; progress-callback вызывается только при смене процента
+        self.state = state or RunState()
+        self.last_progress = -1
         self.stop_flag = False
         self.client = None
         self.channel_id = None
-        self.auth_code = None
-        self.password = None
         self.last_error_message = ""
 
+    @PROFILER.timed('telegram.invite_user')
     async def invite_user(self, client, chat_id, user):
         """Приглашение пользователя"""
+        errors = lazy_import('telethon.errors')
         try:
             user_to_add = await client.get_entity(user)
             await client.edit_admin(
@@ -59,55 +467,91 @@ class TelegramWorker(QThread):
             self.last_error_message = error_message  # Сохраняем сообщение об ошибке
             
             if "admin rights do not allow you to do this" in error_message:
-                self.update_log.emit("❌ У вас недостаточно прав администратора для добавления пользователей")
-                self.update_log.emit("🛑 Работа бота остановлена")
+                self.log("❌ У вас недостаточно прав администратора для добавления пользователей")
+                self.log("🛑 Работа бота остановлена")
                 self.stop_flag = True
                 return False
             elif "Recently logged-in users cannot add or change admins" in error_message:
-                self.update_log.emit("❌ Ошибка: Недавно авторизованные пользователи не могут добавлять администраторов")
-                self.update_log.emit("🛑 Работа бота остановлена")
+                self.log("❌ Ошибка: Недавно авторизованные пользователи не могут добавлять администраторов")
+                self.log("🛑 Работа бота остановлена")
                 self.stop_flag = True
                 return False
             
-            self.update_log.emit(f"❌ Ошибка при инвайте пользователя {user}: {error_message}")
+            self.log(f"❌ Ошибка при инвайте пользователя {user}: {error_message}")
             return False
 
+    async def fetch_participants(self, participant_filter, known=None):
+        """Постраничная загрузка подписчиков; при known - до первой страницы без новых ID.
+        Возвращает ([(user_id, username)], число подписчиков по данным Telegram или None)"""
+        channels = lazy_import('telethon.tl.functions.channels')
+        result = []
+        count = None
+        offset = 0
+        limit = 100
+        
+        while True:
+            participants = await self.client(channels.GetParticipantsRequest(
+                self.channel_id,
+                participant_filter,
+                offset=offset,
+                limit=limit,
+                hash=0
+            ))
+            if count is None:
+                count = getattr(participants, 'count', None)
+            
+            if not participants.users:
+                break
+            
+            page = [(participant.id, participant.username) for participant in participants.users
+                    if known is None or participant.id not in known]
+            result.extend(page)
+            
+            offset += len(participants.users)
+            
+            if len(participants.users) < limit or (known is not None and not page):
+                break
+        return result, count
+
+    @PROFILER.timed('telegram.get_participant_usernames')
     async def get_participant_usernames(self):
-        """Получение списка текущих подписчиков канала"""
+        """Получение индекса текущих подписчиков канала (с досрочной остановкой по сохраненному снимку)"""
+        types = lazy_import('telethon.tl.types')
+        index = self.db.load_participants(self.channel_id)
+        stored_count = self.db.participant_count(self.channel_id)
         try:
-            self.update_log.emit("📋 Получение списка текущих подписчиков...")
-            all_participants = []
-            offset = 0
-            limit = 100
+            if index.ids and stored_count is not None:
+                self.log(f"📋 Обновление сохраненного списка подписчиков ({len(index)})...")
+                # Недавние подписчики идут первыми - листаем, пока не встретим только известных
+                new_participants, count = await self.fetch_participants(
+                    types.ChannelParticipantsRecent(), known=index.ids)
+                # Отписки так не видны: снимку верим, только если count вырос ровно на число новых.
+                # Сравниваем с count прошлого прохода, а не с размером снимка - Telegram отдает не всех
+                if count is not None and count == stored_count + len(new_participants):
+                    for user_id, username in new_participants:
+                        index.add(user_id, username)
+                    self.db.save_participants(self.channel_id, new_participants, count)
+                    self.log(f"✅ Найдено {len(index)} подписчиков (новых: {len(new_participants)})")
+                    return index
+                self.log(f"📋 Снимок подписчиков устарел (в канале: {count}, ожидалось: "
+                         f"{stored_count + len(new_participants)}), загружаем полный список...")
+            else:
+                self.log("📋 Получение списка текущих подписчиков...")
             
-            while True:
-                participants = await self.client(GetParticipantsRequest(
-                    self.channel_id,
-                    ChannelParticipantsSearch(''),
-                    offset=offset,
-                    limit=limit,
-                    hash=0
-                ))
-                
-                if not participants.users:
-                    break
-                    
-                all_participants.extend([
-                    participant.username.lower() if participant.username else str(participant.id)
-                    for participant in participants.users
-                ])
-                
-                offset += len(participants.users)
-                
-                if len(participants.users) < limit:
-                    break
+            participants, count = await self.fetch_participants(types.ChannelParticipantsSearch(''))
+            fresh = ParticipantIndex()
+            for user_id, username in participants:
+                fresh.add(user_id, username)
+            # Полный проход заменяет снимок целиком, отписавшиеся из него удаляются
+            self.db.replace_participants(self.channel_id, participants,
+                                         count if count is not None else len(participants))
             
-            self.update_log.emit(f"✅ Найдено {len(all_participants)} подписчиков")
-            return all_participants
+            self.log(f"✅ Найдено {len(fresh)} подписчиков")
+            return fresh
             
         except Exception as e:
-            self.update_log.emit(f"❌ Ошибка при получении списка подписчиков: {str(e)}")
-            return []
+            self.log(f"❌ Ошибка при получении списка подписчиков: {str(e)}")
+            return index
 
     async def get_channel_id(self, channel_link):
         """Получение ID канала из ссылки"""
@@ -124,9 +568,10 @@ class TelegramWorker(QThread):
             channel = await self.client.get_entity(channel_link)
             return channel.id
         except Exception as e:
-            self.update_log.emit(f"❌ Ошибка при получении ID канала: {str(e)}")
+            self.log(f"❌ Ошибка при получении ID канала: {str(e)}")
             return None
 
+    @PROFILER.timed('telegram.connect_and_get_channel')
     async def connect_and_get_channel(self, channel_link):
         """Подключение к Telegram и получение ID канала"""
         if not await self.connect_client():
@@ -137,35 +582,42 @@ class TelegramWorker(QThread):
             # Преобразуем ID в формат, который требует Telegram
             if channel_id > 0:
                 channel_id = int(f"-100{channel_id}")
-            self.update_log.emit(f"✅ ID канала получен успешно: {channel_id}")
+            self.log(f"✅ ID канала получен успешно: {channel_id}")
             return channel_id
         return None
 
     async def bulk_invite(self):
         # Сначала получаем ID канала
+        self.state.set_phase('connecting')
         self.channel_id = await self.connect_and_get_channel(self.channel_link)
         if not self.channel_id:
-            self.update_log.emit("❌ Не удалось получить ID канала")
+            self.log("❌ Не удалось получить ID канала")
             return 0, 0
 
         # Получаем список текущих подписчиков
+        self.state.set_phase('participants')
         existing_participants = await self.get_participant_usernames()
         
         successful = 0
         failed = 0
         skipped = 0
-        total_users = len(self.users)
+        total_users = self.db.count_users('pending')
+        self.state.set_total(total_users)
+        self.state.set_phase('inviting')
 
-        for i, user in enumerate(self.users):
+        # Пользователи читаются из базы пачками, а не из одной большой строки
+        for i, user in enumerate(self.db.iter_users_by_status('pending')):
             if self.stop_flag:
-                self.update_log.emit("🛑 Процесс остановлен пользователем")
+                self.log("🛑 Процесс остановлен пользователем")
                 break
 
             try:
                 # Проверяем, является ли пользователь уже подписчиком
-                user_id = user.replace('@', '').lower() if isinstance(user, str) else str(user)
-                if user_id in existing_participants:
-                    self.update_log.emit(f"⏭️ Пользователь {user} уже подписан на канал")
+                # Пропуски только считаются: строка в лог на каждого пользователя не формируется
+                if user in existing_participants:
+                    self.db.update_status(user, 'skipped', channel=self.channel_link)
+                    self.state.count('skipped')
+                    self.report_progress()
                     skipped += 1
                     continue
 
@@ -173,67 +625,82 @@ class TelegramWorker(QThread):
                 if not result:
                     # Проверяем, была ли это ошибка недавней авторизации
                     if "недавно авторизован" in self.last_error_message:
-                        self.update_log.emit("🛑 Остановка процесса из-за ограничения недавней авторизации")
+                        self.log("🛑 Остановка процесса из-за ограничения недавней авторизации")
                         break  # Прерываем цикл
+                    if self.stop_flag:
+                        # Ошибка прав аккаунта, а не пользователя - оставляем его в очереди
+                        break
+                    self.db.update_status(user, 'failed', self.last_error_message, channel=self.channel_link)
+                    self.state.count('failed')
                     failed += 1
                 else:
+                    self.db.update_status(user, 'invited', channel=self.channel_link)
+                    existing_participants.add(None, user)
+                    self.state.count('invited')
                     successful += 1
 
                 # Обновляем прогресс
-                progress = int((i + 1) / total_users * 100)
-                self.update_progress.emit(progress)
+                self.report_progress()
 
                 # Пауза между пользователями
-                await asyncio.sleep(4)
+                await self.sleep(self.user_delay)
 
                 # Пауза после каждой партии
                 if (i + 1) % self.users_per_batch == 0 and i + 1 < total_users:
-                    self.update_log.emit(f"⏳ Пауза на {self.batch_delay} секунд...")
-                    await asyncio.sleep(self.batch_delay)
+                    self.log(f"⏳ Пауза на {self.batch_delay} секунд...")
+                    self.state.set_phase('batch_pause', self.batch_delay)
+                    await self.sleep(self.batch_delay)
+                    self.state.set_phase('stopping' if self.stop_flag else 'inviting')
 
             except Exception as e:
-                self.update_log.emit(f"❌ Ошибка: {str(e)}")
+                self.log(f"❌ Ошибка: {str(e)}")
+                self.state.count('failed')
+                self.report_progress()
                 failed += 1
 
-        self.update_log.emit(f"📊 Статистика:\n"
+        self.log(f"📊 Статистика:\n"
                             f"✅ Успешно добавлено: {successful}\n"
                             f"⏭️ Пропущено (уже подписаны): {skipped}\n"
                             f"❌ Ошибок: {failed}")
         return successful, failed
 
-    def run(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
-        success = 0
-        failed = 0
+    def report_progress(self):
+        """Вызов progress-callback по состоянию прогона, только при смене процента"""
+        progress = self.state.snapshot().progress
+        if progress != self.last_progress:
+            self.last_progress = progress
+            self.progress(progress)
+
+    def stop(self):
+        self.stop_flag = True
+        self.state.set_phase('stopping')
+
+    async def run_invite(self):
+        self.state.reset()
+        self.last_progress = -1
+        PROFILER.start_run('invite')
         try:
-            success, failed = self.loop.run_until_complete(self.bulk_invite())
-            if self.client and self.client.is_connected():
-                try:
-                    self.loop.run_until_complete(self.client.disconnect())
-                except:
-                    pass
-        except Exception as e:
-            self.update_log.emit(f"❌ Ошибка: {str(e)}")
+            return await self.bulk_invite()
         finally:
-            try:
-                self.loop.stop()
-                self.loop.close()
-            except:
-                pass
-            self.finished_signal.emit((success, failed))
+            self.state.set_phase('finished')
+            if self.client:
+                await self.client_pool.release_client(self.client)
+            summary = PROFILER.finish_run()
+            if summary:
+                self.log(f"⏱️ Профиль прогона ({summary['wall_seconds']} с) сохранен в {summary['path']}")
+
+    def run(self):
+        """Запуск без интерфейса в собственном event loop (профилирование, тесты с FakeClientPool)"""
+        return asyncio.run(self.run_invite())
 
+    @PROFILER.timed('telegram.connect_client')
     async def connect_client(self):
         """Подключение к клиенту Telegram"""
         try:
-            self.update_log.emit("🔄 Подключение к Telegram...")
+            self.log("🔄 Подключение к Telegram...")
             
-            # Создаем клиента
-            session_file = os.path.join('sessions', self.phone)
-            self.client = TelegramClient(session_file, self.api_id, self.api_hash)
-            
-            # Подключаемся
-            await self.client.connect()
+            # Берем подключенного клиента из пула - он же используется для всей дальнейшей работы
+            self.client = await self.client_pool.acquire_client(self.session_file, self.api_id, self.api_hash)
             
             # Проверяем авторизацию с помощью is_user_authorized()
             is_authorized = await self.client.is_user_authorized()
@@ -248,124 +715,1148 @@ class TelegramWorker(QThread):
                     is_authorized = False
             
             if not is_authorized:
-                self.update_log.emit("❌ Сессия не авторизована")
+                self.log("❌ Сессия не авторизована")
+                self.validated(False, "Сессия не авторизована. Пожалуйста, проверьте файл сессии.")
                 return False
                 
-            self.update_log.emit("✅ Успешное подключение к Telegram")
+            self.log("✅ Успешное подключение к Telegram")
+            self.validated(True, "")
             return True
             
         except Exception as e:
-            self.update_log.emit(f"❌ Ошибка при подключении: {str(e)}")
+            self.log(f"❌ Ошибка при подключении: {str(e)}")
+            self.validated(False, f"Не удалось подключиться к Telegram: {str(e)}")
             return False
 
-class UserDatabase:
+class FakeTelegramClient:
+    """Клиент без сети для профилирования InviteRunner: отвечает на запросы из фикстур"""
+    
+    def __init__(self, fixtures=None):
+        fixtures = fixtures or {}
+        self.authorized = fixtures.get('authorized', True)
+        # strict=False: любой неизвестный username считается существующим пользователем
+        self.strict = fixtures.get('strict', False)
+        self.channels = {name.lower(): channel_id for name, channel_id in fixtures.get('channels', {}).items()}
+        self.users = {username.lower(): user_id for username, user_id in fixtures.get('users', {}).items()}
+        self.errors = {username.lower(): message for username, message in fixtures.get('errors', {}).items()}
+        self.participants = [
+            SimpleNamespace(id=user_id, username=username)
+            for user_id, username in fixtures.get('participants', [])
+        ]
+        self.connected = False
+        self.calls = Counter()
+    
+    def is_connected(self):
+        return self.connected
+    
+    async def connect(self):
+        self.calls['connect'] += 1
+        self.connected = True
+    
+    async def disconnect(self):
+        self.connected = False
+    
+    async def is_user_authorized(self):
+        return self.authorized
+    
+    async def get_me(self):
+        return SimpleNamespace(id=0, username='fake') if self.authorized else None
+    
+    async def get_entity(self, entity):
+        self.calls['get_entity'] += 1
+        key = str(entity).strip().lstrip('@').lower()
+        if key in self.channels:
+            return SimpleNamespace(id=self.channels[key])
+        if key in self.users:
+            return SimpleNamespace(id=self.users[key], username=key)
+        if key.isdigit():
+            return SimpleNamespace(id=int(key), username=None)
+        if not self.strict:
+            return SimpleNamespace(id=zlib.crc32(key.encode()), username=key)
+        raise ValueError(f'No user has "{entity}" as username')
+    
+    async def edit_admin(self, channel, user, **kwargs):
+        self.calls['edit_admin'] += 1
+        message = self.errors.get(str(user.username or user.id).lower())
+        if message:
+            raise lazy_import('telethon.errors').RPCError(None, message)
+        self.participants.append(user)
+    
+    async def __call__(self, request):
+        name = type(request).__name__
+        self.calls[name] += 1
+        if name == 'GetParticipantsRequest':
+            participants = self.participants
+            if type(request.filter).__name__ == 'ChannelParticipantsRecent':
+                participants = participants[::-1]
+            return SimpleNamespace(count=len(participants),
+                                   users=participants[request.offset:request.offset + request.limit])
+        raise NotImplementedError(f"FakeTelegramClient не поддерживает {name}")
+
+class FakeClientPool:
+    """Замена TELEGRAM_LOOP для InviteRunner: один FakeTelegramClient, паузы только суммируются"""
+    
+    def __init__(self, fixtures=None):
+        self.client = FakeTelegramClient(fixtures)
+        self.slept = 0
+    
+    async def acquire_client(self, session_file, api_id, api_hash):
+        if not self.client.is_connected():
+            await self.client.connect()
+        return self.client
+    
+    async def release_client(self, client):
+        pass
+    
+    async def sleep(self, seconds):
+        self.slept += seconds
+
+class TelegramWorker(QThread):
+    update_log = Signal(str)
+    auth_code_required = Signal()
+    password_required = Signal()
+    session_validated = Signal(bool, str)
+    finished_signal = Signal(tuple)
+    
+    def __init__(self, api_id, api_hash, phone, channel_link, db, users_per_batch=10, batch_delay=300,
+                 session_file=None):
+        super().__init__()
+        self.runner = InviteRunner(
+            api_id, api_hash, phone, channel_link, db,
+            users_per_batch=users_per_batch,
+            batch_delay=batch_delay,
+            session_file=session_file,
+            on_log=self.update_log.emit,
+            on_session_validated=self.session_validated.emit
+        )
+        # Прогресс и счетчики не пересылаются сигналами: интерфейс опрашивает state по таймеру
+        self.state = self.runner.state
+
+    def stop(self):
+        self.runner.stop()
+
+    def run(self):
+        success = 0
+        failed = 0
+        try:
+            # Работа идет в общем loop, поток worker'а только ждет результат
+            success, failed = TELEGRAM_LOOP.run(self.runner.run_invite())
+        except Exception as e:
+            self.update_log.emit(f"❌ Ошибка: {str(e)}")
+        finally:
+            self.finished_signal.emit((success, failed))
+
+class ConfigStore:
+    """JSON-конфиги из папки configs: кэш с проверкой mtime и атомарная запись"""
+    
+    def __init__(self, directory='configs'):
+        self.directory = directory
+        self.cache = {}
+        self.lock = threading.RLock()
+    
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+    
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+    
+    def load(self, name, default=None):
+        """Чтение конфига; файл перечитывается только если изменился его mtime"""
+        path = self.path(name)
+        with self.lock:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                self.cache.pop(name, None)
+                return default
+            cached = self.cache.get(name)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.cache[name] = (mtime, data)
+            return data
+    
+    def unchanged(self, name, data):
+        """Совпадает ли файл с data; поврежденный JSON считается измененным и будет перезаписан"""
+        try:
+            return self.exists(name) and self.load(name) == data
+        except ValueError:
+            return False
+    
+    def save(self, name, data):
+        """Атомарная запись через временный файл; неизмененный конфиг не перезаписывается"""
+        path = self.path(name)
+        with self.lock:
+            if self.unchanged(name, data):
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self.cache[name] = (os.stat(path).st_mtime_ns, copy.deepcopy(data))
+            return True
+    
+    def delete(self, name):
+        with self.lock:
+            self.cache.pop(name, None)
+            if self.exists(name):
+                os.remove(self.path(name))
+                return True
+            return False
+    
+    def get_session_settings(self, session):
+        """Настройки сессии в едином виде для форматов telegram_api и app_id/app_hash"""
+        config = self.load(session)
+        if config is None:
+            return None
+        api_data = config.get('telegram_api') or {}
+        if api_data:
+            api_id = api_data.get('api_id', '')
+            api_hash = api_data.get('api_hash', '')
+            phone = api_data.get('phone', '')
+        else:
+            # Старый формат
+            api_id = config.get('app_id', '')
+            api_hash = config.get('app_hash', '')
+            phone = config.get('phone', '')
+        return {
+            'api_id': str(api_id or ''),
+            'api_hash': api_hash or '',
+            'phone': phone or session,
+            'channel_link': (config.get('channel_settings') or {}).get('channel_link', '')
+        }
+    
+    def save_session_settings(self, session, api_id, api_hash, phone, channel_link=None):
+        """Сохранение настроек сессии в формате telegram_api с сохранением прочих ключей"""
+        try:
+            config = copy.deepcopy(self.load(session) or {})
+        except ValueError:
+            # Поврежденный конфиг не должен мешать сохранить настройки заново
+            config = {}
+        config.pop('app_id', None)
+        config.pop('app_hash', None)
+        config['telegram_api'] = {
+            'api_id': api_id,
+            'api_hash': api_hash,
+            'phone': phone
+        }
+        if channel_link is not None:
+            config['channel_settings'] = {'channel_link': channel_link}
+        return self.save(session, config)
+
+class SessionRegistry:
+    """Индекс сессий и конфигов: один проход os.scandir, повторное сканирование только при изменении папки"""
+    
+    def __init__(self, root='.', sessions_dir='sessions', configs_dir='configs'):
+        self.root = root
+        self.sessions_dir = sessions_dir
+        self.configs_dir = configs_dir
+        self.sessions = {}
+        self.configs = set()
+        self.dir_mtimes = {}
+        self.lock = threading.RLock()
+    
+    def _dir_changed(self, path):
+        """Проверка mtime папки (меняется при добавлении, удалении и переименовании файлов)"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        changed = self.dir_mtimes.get(path, -1) != mtime
+        self.dir_mtimes[path] = mtime
+        return changed
+    
+    def adopt_root_files(self, force=False):
+        """Перенос файлов сессий и конфигов из рабочей папки, возвращает список сообщений"""
+        messages = []
+        with self.lock:
+            if not self._dir_changed(self.root) and not force:
+                return messages
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith(('.session', '.session-journal')):
+                        target_dir = self.sessions_dir
+                    elif entry.name.endswith('.json'):
+                        target_dir = self.configs_dir
+                    else:
+                        continue
+                    destination = os.path.join(target_dir, entry.name)
+                    try:
+                        if os.path.exists(destination):
+                            # Если файл уже есть в нужной папке, удаляем его из корня
+                            os.remove(entry.path)
+                        else:
+                            shutil.move(entry.path, destination)
+                            messages.append(f"✅ Файл {entry.name} перемещен в папку {target_dir}")
+                    except Exception as e:
+                        messages.append(f"❌ Ошибка при перемещении файла {entry.name}: {str(e)}")
+            # Наши собственные перемещения не должны вызывать повторное сканирование
+            self._dir_changed(self.root)
+        return messages
+    
+    def refresh(self, force=False):
+        """Обновление индекса; возвращает True, если что-то было пересканировано"""
+        changed = False
+        with self.lock:
+            if self._dir_changed(self.sessions_dir) or force:
+                sessions = {}
+                if os.path.isdir(self.sessions_dir):
+                    with os.scandir(self.sessions_dir) as entries:
+                        for entry in entries:
+                            if entry.name.endswith('.session') and entry.is_file():
+                                stat = entry.stat()
+                                sessions[entry.name[:-len('.session')]] = {
+                                    'path': entry.path,
+                                    'size': stat.st_size,
+                                    'mtime': stat.st_mtime
+                                }
+                self.sessions = sessions
+                changed = True
+            if self._dir_changed(self.configs_dir) or force:
+                configs = set()
+                if os.path.isdir(self.configs_dir):
+                    with os.scandir(self.configs_dir) as entries:
+                        for entry in entries:
+                            if entry.name.endswith('.json') and entry.is_file():
+                                configs.add(entry.name[:-len('.json')])
+                self.configs = configs
+                changed = True
+        return changed
+    
+    def names(self):
+        with self.lock:
+            return sorted(self.sessions)
+    
+    def has_session(self, phone):
+        return phone in self.sessions
+    
+    def has_config(self, phone):
+        return phone in self.configs
+    
+    def info(self, phone):
+        return self.sessions.get(phone)
+    
+    def session_path(self, phone):
+        """Путь к сессии без расширения, как его ожидает TelegramClient"""
+        return os.path.join(self.sessions_dir, phone)
+    
+    def remove_session_files(self, phone):
+        """Удаление файлов сессии и журнала с обновлением индекса"""
+        with self.lock:
+            for suffix in ('.session', '.session-journal'):
+                path = self.session_path(phone) + suffix
+                if os.path.exists(path):
+                    os.remove(path)
+            self.sessions.pop(phone, None)
+            self._dir_changed(self.sessions_dir)
+
+class UsernameNormalizer:
+    """Приведение входных списков к единому виду (username без @, числовой ID) с удалением дубликатов"""
+    
+    # Единые правила для canonical() и normalize_many(): после strip().lower() значение
+    # проверяется на пустоту и ссылку-приглашение, затем проходит STEPS, lstrip('@') и VALID
+    EMPTY = ('', 'nan', 'none')
+    INVITE_LINK = re.compile(r'^(?:https?://)?(?:www\.)?(?:t\.me|telegram\.me)/(?:\+|joinchat/)')
+    # (регулярка, замена, подстрока без которой регулярка не сработает - для отбора строк в пачке)
+    STEPS = (
+        # Числовые ID из Excel приходят как float: 123456.0
+        (re.compile(r'^(\d+)\.0$'), r'\1', '.0'),
+        # t.me/name, https://telegram.me/s/name/123?x - остается только имя
+        (re.compile(r'^(?:https?://)?(?:www\.)?(?:t\.me|telegram\.me|telegram\.dog)/(?:s/)?([^/?#]*).*$'), r'\1', '/'),
+    )
+    VALID = re.compile(r'\d+|[a-z][a-z0-9_]{3,31}')
+    REASONS = {'empty': 'пустые', 'invite_link': 'ссылки-приглашения', 'invalid': 'некорректные', 'duplicate': 'дубликаты'}
+    
+    def __init__(self, sample_size=20):
+        self.total = 0
+        self.kept = 0
+        self.dropped = Counter()
+        self.samples = []
+        self.sample_size = sample_size
+    
+    @classmethod
+    def canonical(cls, value):
+        """Приведение одного значения, пустая строка - если значение не является пользователем"""
+        text = str(value).strip().lower()
+        if text in cls.EMPTY or cls.INVITE_LINK.match(text):
+            return ''
+        for pattern, replacement, hint in cls.STEPS:
+            if hint in text:
+                text = pattern.sub(replacement, text)
+        text = text.lstrip('@')
+        return text if cls.VALID.fullmatch(text) else ''
+    
+    def normalize_many(self, values):
+        """Векторная обработка пачки значений, возвращает уникальные в пачке имена в исходном порядке"""
+        pd = lazy_import('pandas')
+        series = pd.Series(list(values), dtype=object)
+        if series.empty:
+            return []
+        self.total += len(series)
+        missing = series.isna()
+        text = series.where(~missing, '').astype(str).str.strip().str.lower()
+        empty = missing | text.isin(self.EMPTY)
+        invite = ~empty & text.str.contains(self.INVITE_LINK.pattern, regex=True)
+        # Регулярки гоняем только по строкам, где они могут сработать
+        for pattern, replacement, hint in self.STEPS:
+            rows = text.str.contains(hint, regex=False)
+            if rows.any():
+                text[rows] = text[rows].str.replace(pattern.pattern, replacement, regex=True)
+        text = text.str.lstrip('@')
+        invalid = ~empty & ~invite & ~text.str.fullmatch(self.VALID.pattern).fillna(False).astype(bool)
+        valid = ~(empty | invite | invalid)
+        candidates = text[valid]
+        # Повторы между пачками не храним в памяти - их отсекает база, см. record_inserted()
+        duplicate = candidates.duplicated()
+        result = candidates[~duplicate].tolist()
+        
+        for reason, mask in (('empty', empty), ('invite_link', invite), ('invalid', invalid)):
+            self.drop(reason, series[mask])
+        self.drop('duplicate', series[valid][duplicate.to_numpy()])
+        return result
+    
+    def record_inserted(self, candidates, inserted):
+        """Учет результата вставки: имена, которых база не приняла, уже были в ней или в прошлых пачках"""
+        self.kept += inserted
+        if candidates > inserted:
+            self.dropped['duplicate'] += candidates - inserted
+    
+    def drop(self, reason, rows):
+        if rows.empty:
+            return
+        self.dropped[reason] += len(rows)
+        free = self.sample_size - len(self.samples)
+        if free > 0 and reason != 'empty':
+            self.samples.extend((reason, str(value)) for value in rows.head(free))
+    
+    def summary(self):
+        """Строка отчета об отброшенных строках для лога"""
+        if not self.dropped:
+            return f"обработано {self.total}, отброшенных нет"
+        details = ', '.join(f"{self.REASONS[reason]}: {count}" for reason, count in self.dropped.items())
+        return f"обработано {self.total}, принято {self.kept}, отброшено {sum(self.dropped.values())} ({details})"
+
+class ParticipantIndex:
+    """Множество подписчиков канала с поиском за O(1) по числовому ID и по username"""
+    
     def __init__(self):
-        self.db_path = os.path.join('data', 'users.db')
+        self.ids = set()
+        self.usernames = set()
+    
+    def add(self, user_id, username=None):
+        if user_id is not None:
+            self.ids.add(int(user_id))
+        if username:
+            # Интернирование: одинаковые строки из базы и из API хранятся один раз
+            self.usernames.add(sys.intern(username.lower()))
+    
+    def __contains__(self, user):
+        if isinstance(user, int):
+            return user in self.ids
+        value = str(user).strip().lstrip('@').lower()
+        # Полные правила нужны только ссылкам и float-ID, остальное сводится к strip/lower
+        if '/' in value or value.endswith('.0'):
+            value = UsernameNormalizer.canonical(value)
+        if value.isdigit():
+            return int(value) in self.ids
+        return value in self.usernames
+    
+    def __len__(self):
+        return max(len(self.ids), len(self.usernames))
+
+class UserDatabase:
+    def __init__(self, db_path=None, chunk_size=5000):
+        self.db_path = db_path or os.path.join('data', 'users.db')
+        self.chunk_size = chunk_size
+        self.lock = threading.RLock()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Одно долгоживущее соединение вместо connect/close на каждый запрос
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
         self.create_database()
     
     def create_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                status TEXT,
-                last_update TIMESTAMP,
-                channel TEXT,
-                notes TEXT
-            )
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    status TEXT,
+                    last_update TIMESTAMP,
+                    channel TEXT,
+                    notes TEXT
+                )
+            ''')
+            # (status, rowid) - порядок для обхода и страниц по ключу; отдельные индексы для статистики не нужны
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)')
+            self.conn.execute('DROP INDEX IF EXISTS idx_users_status_channel')
+            self.conn.execute('DROP INDEX IF EXISTS idx_users_last_update')
+            self.create_stats_tables()
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS participants (
+                    channel_id INTEGER,
+                    user_id INTEGER,
+                    username TEXT,
+                    PRIMARY KEY (channel_id, user_id)
+                ) WITHOUT ROWID
+            ''')
+            # Число подписчиков по данным Telegram на момент снимка: полный список бывает короче count
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS participant_snapshots (
+                    channel_id INTEGER PRIMARY KEY,
+                    count INTEGER
+                )
+            ''')
+    
+    def create_stats_tables(self):
+        """Агрегаты для вкладки статистики: вставки и удаления учитывают методы класса пачками,
+        смену статуса - триггер на users"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_counts'").fetchone()
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_counts (
+                status TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (status, channel)
+            ) WITHOUT ROWID
+        ''')
+        # День последнего изменения статуса - по локальному времени, last_update хранится в UTC
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_activity (
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, status)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS users_stats_update AFTER UPDATE OF status, channel, last_update ON users
+            BEGIN
+                UPDATE user_counts SET count = count - 1
+                WHERE status = IFNULL(OLD.status, '') AND channel = IFNULL(OLD.channel, '');
+                INSERT INTO user_counts (status, channel, count)
+                SELECT IFNULL(NEW.status, ''), IFNULL(NEW.channel, ''), 1 WHERE 1
+                ON CONFLICT(status, channel) DO UPDATE SET count = count + 1;
+                UPDATE user_activity SET count = count - 1
+                WHERE OLD.last_update IS NOT NULL
+                  AND day = date(OLD.last_update, 'localtime') AND status = IFNULL(OLD.status, '');
+                INSERT INTO user_activity (day, status, count)
+                SELECT date(NEW.last_update, 'localtime'), IFNULL(NEW.status, ''), 1 WHERE NEW.last_update IS NOT NULL
+                ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+            END
         ''')
-        conn.commit()
-        conn.close()
+        if not exists:
+            # База без агрегатов (создана до вкладки статистики): один полный проход
+            self.rebuild_stats()
+    
+    def rebuild_stats(self):
+        """Полный пересчет агрегатов статистики по таблице users"""
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM user_counts')
+            self.conn.execute('DELETE FROM user_activity')
+            self.conn.execute('''
+                INSERT INTO user_counts (status, channel, count)
+                SELECT IFNULL(status, ''), IFNULL(channel, ''), COUNT(*) FROM users
+                GROUP BY IFNULL(status, ''), IFNULL(channel, '')
+            ''')
+            self.conn.execute('''
+                INSERT INTO user_activity (day, status, count)
+                SELECT date(last_update, 'localtime'), IFNULL(status, ''), COUNT(*) FROM users
+                WHERE last_update IS NOT NULL
+                GROUP BY date(last_update, 'localtime'), IFNULL(status, '')
+            ''')
+    
+    def _count_inserted(self, count):
+        """Учет новых пользователей (всегда pending без канала) в агрегате; вызывается внутри транзакции вставки"""
+        if count:
+            self.conn.execute('''
+                INSERT INTO user_counts (status, channel, count) VALUES ('pending', '', ?)
+                ON CONFLICT(status, channel) DO UPDATE SET count = count + excluded.count
+            ''', (count,))
+    
+    def _chunks(self, rows):
+        """Разбиение последовательности строк на пачки по chunk_size"""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
     
     def add_user(self, username):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR IGNORE INTO users (username, status) VALUES (?, ?)',
-                      (username, 'pending'))
-        conn.commit()
-        conn.close()
-    
-    def update_status(self, username, status, notes=''):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE users 
-            SET status = ?, last_update = CURRENT_TIMESTAMP, notes = ?
-            WHERE username = ?
-        ''', (status, notes, username))
-        conn.commit()
-        conn.close()
+        self.add_users([username])
+    
+    @PROFILER.timed('db.add_users')
+    def add_users(self, usernames):
+        """Пакетное добавление пользователей, возвращает количество новых записей"""
+        added = 0
+        for chunk in self._chunks((username, 'pending') for username in usernames):
+            with self.lock, self.conn:
+                inserted = self.conn.executemany(
+                    'INSERT OR IGNORE INTO users (username, status) VALUES (?, ?)', chunk).rowcount
+                self._count_inserted(inserted)
+                added += inserted
+        return added
     
+    def update_status(self, username, status, notes='', channel=None):
+        self.update_statuses([(username, status, notes)], channel=channel)
+    
+    @PROFILER.timed('db.update_statuses')
+    def update_statuses(self, updates, channel=None):
+        """Пакетное обновление статусов: элементы (username, status) или (username, status, notes)"""
+        updated = 0
+        rows = ((item[1], item[2] if len(item) > 2 else '', channel, item[0]) for item in updates)
+        for chunk in self._chunks(rows):
+            with self.lock, self.conn:
+                # rowcount, а не total_changes: изменения агрегатов триггером сюда не входят
+                updated += self.conn.executemany('''
+                    UPDATE users 
+                    SET status = ?, last_update = CURRENT_TIMESTAMP, notes = ?, channel = COALESCE(?, channel)
+                    WHERE username = ?
+                ''', chunk).rowcount
+        return updated
+    
+    @PROFILER.timed('db.get_pending_users')
     def get_pending_users(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT username FROM users WHERE status = "pending"')
-        users = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return users
+        with self.lock:
+            cursor = self.conn.execute("SELECT username FROM users WHERE status = 'pending'")
+            return [row[0] for row in cursor.fetchall()]
+    
+    @PROFILER.timed('db.count_users')
+    def count_users(self, status=None):
+        with self.lock:
+            if status is None:
+                return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            return self.conn.execute('SELECT COUNT(*) FROM users WHERE status = ?', (status,)).fetchone()[0]
+    
+    @PROFILER.timed('db.get_users_page')
+    def get_users_page(self, after_rowid, limit, status=None):
+        """Страница (rowid, username, status) после after_rowid в порядке добавления - поиск по ключу, без OFFSET"""
+        with self.lock:
+            if status is None:
+                cursor = self.conn.execute(
+                    'SELECT rowid, username, status FROM users WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                    (after_rowid, limit))
+            else:
+                cursor = self.conn.execute(
+                    'SELECT rowid, username, status FROM users WHERE status = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                    (status, after_rowid, limit))
+            return cursor.fetchall()
+    
+    @PROFILER.timed('db.rowid_after')
+    def rowid_after(self, after_rowid, skip, status=None):
+        """rowid строки, стоящей на skip позиций после after_rowid (None, если строк меньше).
+        Нужен только при прыжке к далекой странице; читает индекс, а не строки таблицы"""
+        with self.lock:
+            if status is None:
+                row = self.conn.execute(
+                    'SELECT rowid FROM users WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?',
+                    (after_rowid, skip - 1)).fetchone()
+            else:
+                row = self.conn.execute(
+                    'SELECT rowid FROM users WHERE status = ? AND rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?',
+                    (status, after_rowid, skip - 1)).fetchone()
+            return row[0] if row else None
+    
+    def iter_users_by_status(self, status='pending'):
+        """Постраничный обход пользователей с нужным статусом по rowid"""
+        last_rowid = 0
+        while True:
+            with PROFILER.span('db.iter_users_by_status'), self.lock:
+                rows = self.conn.execute(
+                    'SELECT rowid, username FROM users WHERE status = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                    (status, last_rowid, self.chunk_size)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, username in rows:
+                yield username
+    
+    @PROFILER.timed('db.merge_from')
+    def merge_from(self, file_path, status='pending', step=10000, on_progress=None, should_stop=None,
+                   normalizer=None):
+        """Слияние пользователей из другой базы через ATTACH и INSERT ... SELECT диапазонами rowid.
+        Счетчики отброшенных строк пишутся в normalizer. Возвращает (добавлено, просмотрено rowid)"""
+        normalizer = normalizer or UsernameNormalizer()
+        # Каждое имя проходит те же правила, что и при импорте из файла
+        self.conn.create_function('canonical_username', 1, UsernameNormalizer.canonical, deterministic=True)
+        with self.lock:
+            self.conn.execute('ATTACH DATABASE ? AS source', (file_path,))
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS merge_batch (name TEXT)')
+        try:
+            with self.lock:
+                if not self.conn.execute(
+                        "SELECT 1 FROM source.sqlite_master WHERE type = 'table' AND name = 'users'").fetchone():
+                    raise ValueError("в выбранной базе нет таблицы users")
+                first, last = self.conn.execute('SELECT MIN(rowid), MAX(rowid) FROM source.users').fetchone()
+            added = 0
+            scanned = 0
+            if first is None:
+                return added, scanned
+            for start in range(first, last + 1, step):
+                if should_stop and should_stop():
+                    break
+                # Блокировка держится на один шаг: нормализация на Python и вставка идут отдельно,
+                # между ними GUI и worker'ы успевают обратиться к базе
+                with self.lock, self.conn:
+                    # Имена диапазона нормализуются один раз во временную таблицу, по ней же считаем отброшенные
+                    self.conn.execute('DELETE FROM temp.merge_batch')
+                    rows = self.conn.execute('''
+                        INSERT INTO temp.merge_batch (name)
+                        SELECT canonical_username(username) FROM source.users
+                        WHERE rowid >= ? AND rowid < ? AND status = ?
+                    ''', (start, start + step, status)).rowcount
+                    valid = self.conn.execute(
+                        "SELECT COUNT(*) FROM temp.merge_batch WHERE name <> ''").fetchone()[0]
+                with self.lock, self.conn:
+                    inserted = self.conn.execute('''
+                        INSERT INTO main.users (username, status)
+                        SELECT name, 'pending' FROM temp.merge_batch
+                        WHERE name <> ''
+                        ON CONFLICT(username) DO NOTHING
+                    ''').rowcount
+                    self._count_inserted(inserted)
+                added += inserted
+                normalizer.total += rows
+                if rows > valid:
+                    normalizer.dropped['invalid'] += rows - valid
+                # Дубликаты - и повторы в источнике, и имена, которые уже есть в базе
+                normalizer.record_inserted(valid, inserted)
+                scanned = min(start + step, last + 1) - first
+                if on_progress:
+                    on_progress(scanned, last + 1 - first)
+            return added, scanned
+        finally:
+            with self.lock:
+                self.conn.execute('DROP TABLE IF EXISTS temp.merge_batch')
+                self.conn.execute('DETACH DATABASE source')
+    
+    @PROFILER.timed('db.load_participants')
+    def load_participants(self, channel_id):
+        """Загрузка сохраненного снимка подписчиков канала"""
+        index = ParticipantIndex()
+        with self.lock:
+            cursor = self.conn.execute(
+                'SELECT user_id, username FROM participants WHERE channel_id = ?', (channel_id,))
+            for user_id, username in cursor:
+                index.add(user_id, username)
+        return index
+    
+    def participant_count(self, channel_id):
+        """Число подписчиков по данным Telegram на момент снимка или None, если снимка нет"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT count FROM participant_snapshots WHERE channel_id = ?', (channel_id,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_participant_count(self, channel_id, count):
+        self.conn.execute('''
+            INSERT INTO participant_snapshots (channel_id, count) VALUES (?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET count = excluded.count
+        ''', (channel_id, count))
+    
+    @PROFILER.timed('db.replace_participants')
+    def replace_participants(self, channel_id, participants, count):
+        """Замена снимка подписчиков канала результатом полной загрузки"""
+        rows = ((channel_id, user_id, username.lower() if username else None)
+                for user_id, username in participants)
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM participants WHERE channel_id = ?', (channel_id,))
+            for chunk in self._chunks(rows):
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO participants (channel_id, user_id, username) VALUES (?, ?, ?)', chunk)
+            self._set_participant_count(channel_id, count)
+    
+    @PROFILER.timed('db.save_participants')
+    def save_participants(self, channel_id, participants, count):
+        """Добавление подписчиков (user_id, username) в снимок канала"""
+        rows = ((channel_id, user_id, username.lower() if username else None)
+                for user_id, username in participants)
+        for chunk in self._chunks(rows):
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO participants (channel_id, user_id, username) VALUES (?, ?, ?)', chunk)
+        with self.lock, self.conn:
+            self._set_participant_count(channel_id, count)
+    
+    @staticmethod
+    def _utc_bound(day):
+        """Начало локальных суток day в формате CURRENT_TIMESTAMP (UTC), которым пишется last_update"""
+        start = datetime.combine(day, datetime.min.time()).astimezone(timezone.utc)
+        return start.strftime('%Y-%m-%d %H:%M:%S')
+    
+    @classmethod
+    def _filter_sql(cls, status=None, channel=None, date_from=None, date_to=None):
+        """Условие WHERE для фильтров экспорта (даты - локальные, date_to включительно)"""
+        conditions = []
+        params = []
+        if status:
+            conditions.append('status = ?')
+            params.append(status)
+        if channel:
+            conditions.append('channel = ?')
+            params.append(channel)
+        if date_from:
+            conditions.append('last_update >= ?')
+            params.append(cls._utc_bound(date_from))
+        if date_to:
+            conditions.append('last_update < ?')
+            params.append(cls._utc_bound(date_to + timedelta(days=1)))
+        return ' AND '.join(conditions) or '1', params
+    
+    @PROFILER.timed('db.count_filtered')
+    def count_filtered(self, **filters):
+        where, params = self._filter_sql(**filters)
+        with self.lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM users WHERE {where}', params).fetchone()[0]
+    
+    def iter_user_rows(self, **filters):
+        """Пачки полных строк пользователей по фильтрам, постранично по rowid"""
+        where, params = self._filter_sql(**filters)
+        last_rowid = 0
+        while True:
+            with PROFILER.span('db.iter_user_rows'), self.lock:
+                rows = self.conn.execute(
+                    f'SELECT rowid, username, status, last_update, channel, notes FROM users '
+                    f'WHERE rowid > ? AND {where} ORDER BY rowid LIMIT ?',
+                    [last_rowid] + params + [self.chunk_size]).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+    
+    def stats_version(self):
+        """Метка изменений базы: число изменений через соединение (все записи идут через него)"""
+        return self.conn.total_changes
+    
+    @PROFILER.timed('db.count_by_status_channel')
+    def count_by_status_channel(self):
+        """Количество пользователей по статусу и каналу из агрегата user_counts"""
+        with self.lock:
+            return self.conn.execute('''
+                SELECT NULLIF(status, ''), NULLIF(channel, ''), count FROM user_counts WHERE count > 0
+            ''').fetchall()
+    
+    @PROFILER.timed('db.count_updates_by_day')
+    def count_updates_by_day(self):
+        """Пользователи по дню последнего изменения (локальное время) и статусу из агрегата user_activity"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT day, NULLIF(status, ''), count FROM user_activity WHERE count > 0").fetchall()
+    
+    @PROFILER.timed('db.delete_users')
+    def delete_users(self, status=None):
+        with self.lock, self.conn:
+            # Удаляется весь статус целиком, поэтому и его агрегаты просто удаляются
+            if status is None:
+                self.conn.execute('DELETE FROM user_counts')
+                self.conn.execute('DELETE FROM user_activity')
+                return self.conn.execute('DELETE FROM users').rowcount
+            self.conn.execute('DELETE FROM user_counts WHERE status = ?', (status,))
+            self.conn.execute('DELETE FROM user_activity WHERE status = ?', (status,))
+            return self.conn.execute('DELETE FROM users WHERE status = ?', (status,)).rowcount
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class BackgroundWorker(QThread):
+    """Общая часть фоновых операций с базой: лог, прогресс в процентах и остановка"""
+    update_log = Signal(str)
+    update_progress = Signal(int)
+    finished_signal = Signal(tuple)
+    
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.stop_flag = False
+        self.progress = 0
+    
+    def stop(self):
+        self.stop_flag = True
+    
+    def set_progress(self, done, total):
+        """Отправка прогресса только при изменении процента; без total (объем неизвестен) не отправляем,
+        100% по завершении выставляет сама операция"""
+        if not total:
+            return
+        progress = min(int(done / total * 100), 100)
+        if progress != self.progress:
+            self.progress = progress
+            self.update_progress.emit(progress)
+
+class ImportWorker(BackgroundWorker):
+    def __init__(self, db, file_path, chunk_size=5000):
+        super().__init__(db)
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+    
+    @staticmethod
+    def find_username_column(header):
+        """Поиск колонки username в строке заголовка"""
+        for index, title in enumerate(header):
+            if title is not None and str(title).strip().lower() == 'username':
+                return index
+        return None
+    
+    def read_xlsx(self):
+        """Потоковое чтение xlsx через openpyxl в режиме read-only"""
+        from openpyxl import load_workbook
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            total = sheet.max_row or 0
+            rows = sheet.iter_rows(values_only=True)
+            column = self.find_username_column(next(rows, ()))
+            if column is None:
+                raise ValueError("Excel файл должен содержать колонку 'username'")
+            for index, row in enumerate(rows, start=2):
+                yield row[column] if column < len(row) else None
+                if index % self.chunk_size == 0:
+                    self.set_progress(index, total)
+        finally:
+            workbook.close()
+    
+    def read_xls(self):
+        """Чтение старого формата xls (только целиком, потоковое чтение не поддерживается)"""
+        self.update_log.emit("⚠️ Формат .xls читается целиком, для больших файлов используйте .xlsx или .csv")
+        df = lazy_import('pandas').read_excel(self.file_path)
+        if 'username' not in df.columns:
+            raise ValueError("Excel файл должен содержать колонку 'username'")
+        yield from df['username']
+    
+    def read_text(self, is_csv):
+        """Построчное чтение csv/txt с прогрессом по позиции в файле"""
+        total = os.path.getsize(self.file_path)
+        with open(self.file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            if is_csv:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+                except csv.Error:
+                    dialect = csv.excel
+                rows = csv.reader(f, dialect)
+                header = next(rows, [])
+                column = self.find_username_column(header)
+                if column is None:
+                    # Заголовка нет - берем первую колонку, первая строка тоже данные
+                    column = 0
+                    if header:
+                        yield header[0]
+            else:
+                rows = ([line] for line in f)
+                column = 0
+            for index, row in enumerate(rows, start=1):
+                yield row[column] if column < len(row) else None
+                if index % self.chunk_size == 0:
+                    self.set_progress(f.buffer.tell(), total)
+    
+    def read_values(self):
+        extension = os.path.splitext(self.file_path)[1].lower()
+        if extension == '.xlsx':
+            return self.read_xlsx()
+        if extension == '.xls':
+            return self.read_xls()
+        return self.read_text(is_csv=extension == '.csv')
+    
+    def add_chunk(self, normalizer, chunk):
+        names = normalizer.normalize_many(chunk)
+        inserted = self.db.add_users(names)
+        normalizer.record_inserted(len(names), inserted)
+        return inserted
+    
+    def run(self):
+        added = 0
+        normalizer = UsernameNormalizer()
+        try:
+            self.update_log.emit(f"📥 Импорт пользователей из {os.path.basename(self.file_path)}...")
+            chunk = []
+            for value in self.read_values():
+                if self.stop_flag:
+                    break
+                chunk.append(value)
+                if len(chunk) >= self.chunk_size:
+                    added += self.add_chunk(normalizer, chunk)
+                    chunk = []
+            if chunk:
+                added += self.add_chunk(normalizer, chunk)
+            if self.stop_flag:
+                self.update_log.emit(f"🛑 Импорт остановлен пользователем, добавлено {added} новых пользователей")
+                return
+            self.set_progress(1, 1)
+            self.update_log.emit(f"✅ Импортировано {added} новых пользователей ({normalizer.summary()})")
+            if normalizer.samples:
+                examples = ', '.join(f"{value} ({UsernameNormalizer.REASONS[reason]})"
+                                     for reason, value in normalizer.samples[:5])
+                self.update_log.emit(f"⚠️ Примеры отброшенных строк: {examples}")
+        except Exception as e:
+            self.update_log.emit(f"❌ Ошибка при импорте: {str(e)}")
+        finally:
+            self.finished_signal.emit((added, normalizer.total))
+
+class MergeWorker(BackgroundWorker):
+    def __init__(self, db, file_path):
+        super().__init__(db)
+        self.file_path = file_path
+    
+    def run(self):
+        added = 0
+        normalizer = UsernameNormalizer()
+        try:
+            self.update_log.emit(f"📥 Слияние с базой {os.path.basename(self.file_path)}...")
+            added, scanned = self.db.merge_from(
+                self.file_path, on_progress=self.set_progress, should_stop=lambda: self.stop_flag,
+                normalizer=normalizer)
+            if self.stop_flag:
+                self.update_log.emit(f"🛑 Слияние остановлено пользователем, добавлено {added} новых пользователей")
+                return
+            self.set_progress(1, 1)
+            self.update_log.emit(f"✅ Загружено {added} новых пользователей из базы данных ({normalizer.summary()})")
+        except Exception as e:
+            self.update_log.emit(f"❌ Ошибка при загрузке из БД: {str(e)}")
+        finally:
+            self.finished_signal.emit((added,))
+
+class ExportWorker(BackgroundWorker):
+    COLUMNS = ['username', 'status', 'last_update', 'channel', 'notes']
+    # Лимит строк листа Excel, одна строка уходит на заголовок
+    XLSX_MAX_ROWS = 1048576 - 1
+    
+    def __init__(self, db, export_path, filters=None):
+        super().__init__(db)
+        self.export_path = export_path
+        self.filters = filters or {}
+    
+    def iter_chunks(self, total):
+        """Пачки строк из базы с отправкой прогресса"""
+        written = 0
+        for rows in self.db.iter_user_rows(**self.filters):
+            if self.stop_flag:
+                raise InterruptedError("экспорт остановлен пользователем")
+            yield rows
+            written += len(rows)
+            self.set_progress(written, total)
+    
+    def write_xlsx(self, chunks):
+        """Запись xlsx в режиме write-only (строки не держатся в памяти)"""
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('users')
+        sheet.append(self.COLUMNS)
+        try:
+            for rows in chunks:
+                for row in rows:
+                    sheet.append(row)
+        except BaseException:
+            # Закрываем временный файл листа, иначе openpyxl ругается при сборке мусора
+            sheet.close()
+            raise
+        workbook.save(self.export_path)
+    
+    def write_csv(self, chunks):
+        # utf-8-sig, чтобы Excel правильно открыл кириллицу
+        with open(self.export_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            for rows in chunks:
+                writer.writerows(rows)
+    
+    def write_parquet(self, chunks):
+        try:
+            pa = lazy_import('pyarrow')
+            pq = lazy_import('pyarrow.parquet')
+        except ImportError:
+            raise RuntimeError("для экспорта в Parquet установите пакет pyarrow")
+        schema = pa.schema([(column, pa.string()) for column in self.COLUMNS])
+        with pq.ParquetWriter(self.export_path, schema) as writer:
+            for rows in chunks:
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array([None if value is None else str(value) for value in column], pa.string())
+                     for column in columns],
+                    schema=schema
+                ))
+    
+    def run(self):
+        total = 0
+        try:
+            total = self.db.count_filtered(**self.filters)
+            self.update_log.emit(f"📤 Экспорт {total} записей в {self.export_path}...")
+            extension = os.path.splitext(self.export_path)[1].lower()
+            writers = {'.xlsx': self.write_xlsx, '.csv': self.write_csv, '.parquet': self.write_parquet}
+            if extension not in writers:
+                raise ValueError(f"неподдерживаемый формат {extension}")
+            if extension == '.xlsx' and total > self.XLSX_MAX_ROWS:
+                raise ValueError(f"{total} записей не помещаются на лист Excel "
+                                 f"(максимум {self.XLSX_MAX_ROWS}), выберите формат CSV или Parquet")
+            writers[extension](self.iter_chunks(total))
+            self.update_progress.emit(100)
+            self.update_log.emit(f"✅ Данные экспортированы в {self.export_path}")
+        except InterruptedError:
+            # Недописанный файл не оставляем - его легко принять за полный экспорт
+            if os.path.exists(self.export_path):
+                os.remove(self.export_path)
+            self.update_log.emit("🛑 Экспорт остановлен пользователем")
+        except Exception as e:
+            self.update_log.emit(f"❌ Ошибка при экспорте: {str(e)}")
+        finally:
+            self.finished_signal.emit((total, self.export_path))
 
 class CheckAccountsWorker(QThread):
     log_signal = Signal(str)
     show_dialog_signal = Signal(str, str)
     
-    def __init__(self, accounts, parent=None):
+    def __init__(self, accounts, config_store, parent=None):
         super().__init__(parent)
         self.accounts = accounts
+        self.config_store = config_store
         
     def run(self):
-        import asyncio
-        
-        # Создаем новый event loop для этого потока
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         for account in self.accounts:
             self.log_signal.emit(f"\nПроверка аккаунта {account}...")
             
             try:
                 session_file = os.path.join('sessions', account)
-                config_file = os.path.join('configs', f"{account}.json")
                 
-                # Проверяем существование файлов
-                if not os.path.exists(config_file):
+                # Загружаем API данные
+                settings = self.config_store.get_session_settings(account)
+                if settings is None:
                     self.log_signal.emit(f"❌ Не найден конфиг для {account}")
                     continue
-                    
-                # Загружаем API данные
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    if 'telegram_api' in config:
-                        api_data = config['telegram_api']
-                        api_id = api_data.get('api_id')
-                        api_hash = api_data.get('api_hash')
-                    else:
-                        api_id = config.get('app_id')
-                        api_hash = config.get('app_hash')
+                api_id = int(settings['api_id'])
+                api_hash = settings['api_hash']
                 
                 self.log_signal.emit(f"📱 Найдены данные API - ID: {api_id}, Hash: {api_hash}")
                 
-                # Создаем и подключаем клиент
-                client = TelegramClient(session_file, api_id, api_hash, loop=loop)
-                
-                # Запускаем проверку в event loop
-                loop.run_until_complete(self._check_account(client, account))
+                # Запускаем проверку в общем event loop
+                TELEGRAM_LOOP.run(self._check_account(session_file, api_id, api_hash, account))
                 
             except Exception as e:
                 self.log_signal.emit(f"❌ Ошибка при проверке: {str(e)}")
                 
         self.log_signal.emit("\nПроверка завершена!")
-        loop.close()
     
-    async def _check_account(self, client, account):
+    async def _check_account(self, session_file, api_id, api_hash, account):
         """Асинхронная проверка одного аккаунта"""
+        client = await TELEGRAM_LOOP.acquire_client(session_file, api_id, api_hash)
         try:
-            # Принудительно отключаем клиент если он был подключен
-            if client.is_connected():
-                await client.disconnect()
-            
-            await client.connect()
-            
             try:
                 # Проверяем авторизацию
                 if not await client.is_user_authorized():
@@ -401,34 +1892,231 @@ class CheckAccountsWorker(QThread):
                 return
             
         finally:
-            if client and client.is_connected():
-                await client.disconnect()
+            await TELEGRAM_LOOP.release_client(client)
+
+class UserStats:
+    """Сводка по таблице users: счетчики по статусу и каналу и пользователи по дню последнего изменения.
+    Агрегаты ведут триггеры базы, поэтому обновление читает несколько десятков строк, а не всю таблицу"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.by_status_channel = []
+        self.by_status = Counter()
+        self.by_day = {}
+        self.total = 0
+        self.version = None
+    
+    def refresh(self, force=False):
+        """Обновление сводки; возвращает False, если база не менялась с прошлого раза"""
+        version = self.db.stats_version()
+        if not force and version == self.version:
+            return False
+        self.version = version
+        
+        self.by_status_channel = self.db.count_by_status_channel()
+        self.by_status = Counter()
+        for status, _, count in self.by_status_channel:
+            self.by_status[status] += count
+        self.total = sum(self.by_status.values())
+        self.by_day = {}
+        for day, status, count in self.db.count_updates_by_day():
+            self.by_day.setdefault(day, Counter())[status] = count
+        return True
+
+class UserListModel(QAbstractListModel):
+    """Список пользователей, подгружающий строки из UserDatabase страницами по мере прокрутки"""
+    
+    def __init__(self, db, page_size=500, max_pages=20, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.status = None
+        self.pages = OrderedDict()
+        # Граница страницы: rowid последней строки предыдущей страницы (для первой - 0)
+        self.page_after = {0: 0}
+        self.row_count = self.db.count_users()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+    
+    def page_start(self, page_number):
+        """Граница страницы: из кэша или отсчетом от ближайшей известной предыдущей границы"""
+        after = self.page_after.get(page_number)
+        if after is None:
+            known = max(number for number in self.page_after if number < page_number)
+            after = self.db.rowid_after(
+                self.page_after[known], (page_number - known) * self.page_size, self.status)
+            if after is None:
+                return None
+            self.page_after[page_number] = after
+        return after
+    
+    def get_page(self, page_number):
+        """Страница из кэша или из базы (старые страницы вытесняются)"""
+        page = self.pages.get(page_number)
+        if page is None:
+            after = self.page_start(page_number)
+            page = [] if after is None else self.db.get_users_page(after, self.page_size, self.status)
+            if page:
+                # При прокрутке вниз следующая страница начнется сразу после этой
+                self.page_after[page_number + 1] = page[-1][0]
+            page = [row[1:] for row in page]
+            self.pages[page_number] = page
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_number)
+        return page
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        page_number, offset = divmod(index.row(), self.page_size)
+        page = self.get_page(page_number)
+        if offset >= len(page):
+            return None
+        username, status = page[offset]
+        if role == Qt.ToolTipRole:
+            return f"Статус: {status}"
+        return username
+    
+    def set_status_filter(self, status):
+        self.status = status
+        self.refresh()
+    
+    def refresh(self):
+        self.beginResetModel()
+        self.pages.clear()
+        self.page_after = {0: 0}
+        self.row_count = self.db.count_users(self.status)
+        self.endResetModel()
+
+class ExportDialog(QDialog):
+    """Выбор формата и фильтров экспорта"""
+    
+    FORMATS = [("Excel (*.xlsx)", '.xlsx'), ("CSV (*.csv)", '.csv'), ("Parquet (*.parquet)", '.parquet')]
+    
+    def __init__(self, status_filters, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Экспорт пользователей")
+        layout = QFormLayout(self)
+        
+        self.format_combo = QComboBox()
+        for title, extension in self.FORMATS:
+            self.format_combo.addItem(title, extension)
+        layout.addRow("Формат:", self.format_combo)
+        
+        self.status_combo = QComboBox()
+        self.status_combo.addItem("Все", None)
+        for title, status in status_filters:
+            if status:
+                self.status_combo.addItem(title, status)
+        layout.addRow("Статус:", self.status_combo)
+        
+        self.channel_input = QLineEdit()
+        self.channel_input.setPlaceholderText("Все каналы")
+        layout.addRow("Канал:", self.channel_input)
+        
+        self.date_filter_checkbox = QCheckBox("Только за период")
+        self.date_from_input = QDateEdit(QDate.currentDate().addDays(-30))
+        self.date_to_input = QDateEdit(QDate.currentDate())
+        for date_input in (self.date_from_input, self.date_to_input):
+            date_input.setCalendarPopup(True)
+            date_input.setEnabled(False)
+            self.date_filter_checkbox.toggled.connect(date_input.setEnabled)
+        layout.addRow(self.date_filter_checkbox)
+        layout.addRow("С:", self.date_from_input)
+        layout.addRow("По:", self.date_to_input)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+    
+    def extension(self):
+        return self.format_combo.currentData()
+    
+    def filters(self):
+        filters = {
+            'status': self.status_combo.currentData(),
+            'channel': self.channel_input.text().strip() or None
+        }
+        if self.date_filter_checkbox.isChecked():
+            filters['date_from'] = self.date_from_input.date().toPython()
+            filters['date_to'] = self.date_to_input.date().toPython()
+        return filters
+
+class LogView(QPlainTextEdit):
+    """Лог с ограниченным числом строк, пакетным выводом и полной историей в файле"""
+    
+    def __init__(self, log_file, max_lines=5000, flush_interval=16, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        # Старые строки удаляются автоматически - кольцевой буфер на стороне виджета
+        self.setMaximumBlockCount(max_lines)
+        self.pending = []
+        
+        # Сообщения, пришедшие в пределах одного кадра, выводятся одним обновлением
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(flush_interval)
+        self.flush_timer.timeout.connect(self.flush)
+        
+        # Полная история пишется в файл с ротацией
+        self.file_logger = logging.getLogger(f"inviter.{os.path.splitext(os.path.basename(log_file))[0]}")
+        self.file_logger.setLevel(logging.INFO)
+        self.file_logger.propagate = False
+        if not self.file_logger.handlers:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8', delay=True
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.file_logger.addHandler(handler)
+    
+    def append(self, message):
+        self.pending.append(message)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+    
+    @PROFILER.timed('ui.log_flush')
+    def flush(self):
+        """Вывод накопленных сообщений одним обновлением виджета"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        for message in pending:
+            self.file_logger.info(message)
+        self.appendPlainText('\n'.join(pending))
+    
+    def clear(self):
+        self.flush()
+        super().clear()
 
 class MainWindow(QMainWindow):
+    USER_STATUS_FILTERS = [
+        ("Ожидают", 'pending'),
+        ("Все", None),
+        ("Приглашены", 'invited'),
+        ("Пропущены", 'skipped'),
+        ("Ошибки", 'failed')
+    ]
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Telegram Инвайт через Админку")
+        self.first_paint_done = False
         self.setMinimumSize(800, 600)
         self.worker = None
+        self.import_worker = None
+        self.merge_worker = None
+        self.export_worker = None
         self.sessions = []
+        self.config_store = ConfigStore()
         
-        # Создаем директории если их нет
-        os.makedirs('sessions', exist_ok=True)
-        os.makedirs('configs', exist_ok=True)
-        
-        # Перемещаем файлы сессий в правильную папку
-        for file in os.listdir():
-            if file.endswith('.session') or file.endswith('.session-journal'):
-                try:
-                    src = file
-                    dst = os.path.join('sessions', file)
-                    if os.path.exists(src):
-                        if os.path.exists(dst):
-                            os.remove(src)  # Если файл уже есть в sessions, удаляем из корня
-                        else:
-                            shutil.move(src, dst)  # Иначе перемещаем
-                except Exception as e:
-                    print(f"Ошибка при перемещении файла {file}: {e}")
+        self.session_registry = SessionRegistry()
         
         # Создаем центральный виджет с вкладками
         self.tab_widget = QTabWidget()
@@ -437,18 +2125,27 @@ class MainWindow(QMainWindow):
         # Создаем вкладки
         self.invite_tab = QWidget()
         self.check_tab = QWidget()
+        self.stats_tab = QWidget()
         
         # Настраиваем вкладки (это создаст self.log_text)
         self.setup_invite_tab()
         self.setup_check_tab()
+        self.setup_stats_tab()
         
         # Добавляем вкладки
         self.tab_widget.addTab(self.invite_tab, "Инвайт")
         self.tab_widget.addTab(self.check_tab, "Проверка аккаунтов")
+        self.tab_widget.addTab(self.stats_tab, "Статистика")
         
         # Теперь можно создавать директории, так как log_text уже существует
         self.create_directories()
         
+        # База пользователей (одно соединение на все время работы)
+        self.db = UserDatabase()
+        self.setup_user_list()
+        self.user_stats = UserStats(self.db)
+        self.tab_widget.currentChanged.connect(lambda index: self.refresh_stats())
+        
         # Загружаем список сессий
         self.load_sessions()
         
@@ -477,19 +2174,11 @@ class MainWindow(QMainWindow):
             self.log_message("✅ Структура папок проверена/создана")
 
     def cleanup_root_directory(self):
-        """Перемещение файлов из корневой директории в соответствующие папки"""
+        """Перемещение файлов сессий и конфигов из корневой директории в соответствующие папки"""
         try:
-            # Перемещаем JSON файлы в configs
-            for file in os.listdir():
-                if file.endswith('.json'):
-                    src = file
-                    dst = os.path.join('configs', file)
-                    if os.path.exists(src):
-                        # Если файл уже существует в папке configs, удаляем его из корневой директории
-                        if os.path.exists(dst):
-                            os.remove(src)
-                        else:
-                            os.rename(src, dst)
+            for message in self.session_registry.adopt_root_files():
+                if hasattr(self, 'log_text'):
+                    self.log_message(message)
         except Exception as e:
             if hasattr(self, 'log_text'):
                 self.log_message(f"❌ Ошибка при очистке корневой директории: {str(e)}")
@@ -497,25 +2186,9 @@ class MainWindow(QMainWindow):
     def move_session_files(self):
         """Перемещение всех файлов сессий в папку sessions"""
         try:
-            # Ищем все файлы сессий в корневой директории
-            session_files = [f for f in os.listdir() if f.endswith('.session') or f.endswith('.session-journal')]
-            
-            for file in session_files:
-                try:
-                    source = file
-                    destination = os.path.join('sessions', file)
-                    
-                    # Если файл уже существует в папке sessions, удаляем старый
-                    if os.path.exists(destination):
-                        os.remove(source)
-                    else:
-                        # Иначе перемещаем файл
-                        shutil.move(source, destination)
-                        if hasattr(self, 'log_text'):
-                            self.log_text.append(f"✅ Файл {file} перемещен в папку sessions")
-                except Exception as e:
-                    if hasattr(self, 'log_text'):
-                        self.log_text.append(f"❌ Ошибка при перемещении файла {file}: {str(e)}")
+            for message in self.session_registry.adopt_root_files(force=True):
+                if hasattr(self, 'log_text'):
+                    self.log_text.append(message)
         except Exception as e:
             if hasattr(self, 'log_text'):
                 self.log_text.append(f"❌ Ошибка при поиске файлов сессий: {str(e)}")
@@ -524,29 +2197,17 @@ class MainWindow(QMainWindow):
         """Создание клиента Telegram"""
         try:
             phone = self.session_combo.currentText()
-            # Проверяем наличие файла сессии в обоих местах
-            root_session = f"{phone}.session"
-            sessions_dir_file = os.path.join('sessions', f"{phone}.session")
-            
             self.log_text.append(f"🔍 Поиск файла сессии для {phone}")
             
-            if os.path.exists(root_session):
-                self.log_text.append(f"📁 Найден файл сессии в корневой папке: {root_session}")
-                # Перемещаем файл в папку sessions
-                if not os.path.exists('sessions'):
-                    os.makedirs('sessions')
-                shutil.move(root_session, sessions_dir_file)
-                self.log_text.append("✅ Файл сессии перемещен в папку sessions")
-            
-            if os.path.exists(sessions_dir_file):
-                self.log_text.append(f"📁 Найден файл сессии в папке sessions: {sessions_dir_file}")
+            self.session_registry.refresh()
+            session_info = self.session_registry.info(phone)
+            if session_info:
+                self.log_text.append(f"📁 Найден файл сессии в папке sessions: {session_info['path']}")
             else:
                 self.log_text.append("❌ Файл сессии не найден!")
                 return False
             
-            # Проверяем размер файла сессии
-            session_size = os.path.getsize(sessions_dir_file)
-            self.log_text.append(f"📊 Размер файла сессии: {session_size} байт")
+            self.log_text.append(f"📊 Размер файла сессии: {session_info['size']} байт")
             
             api_id = int(self.api_id_input.text().strip())
             api_hash = self.api_hash_input.text().strip()
@@ -554,8 +2215,8 @@ class MainWindow(QMainWindow):
             self.log_text.append(f"🔑 Создание клиента с API ID: {api_id}")
             
             # Создаем клиента с путем к файлу сессии в папке sessions
-            session_file = os.path.join('sessions', phone)
-            self.client = TelegramClient(session_file, api_id, api_hash)
+            session_file = self.session_registry.session_path(phone)
+            self.client = create_telegram_client(session_file, api_id, api_hash)
             
             return True
         except Exception as e:
@@ -617,23 +2278,59 @@ class MainWindow(QMainWindow):
         users_header_layout = QHBoxLayout()
         users_header_layout.addWidget(QLabel("Список пользователей:"))
         
+        self.status_filter_combo = QComboBox()
+        for title, status in self.USER_STATUS_FILTERS:
+            self.status_filter_combo.addItem(title, status)
+        self.status_filter_combo.currentIndexChanged.connect(self.on_status_filter_changed)
+        users_header_layout.addWidget(self.status_filter_combo)
+        
+        self.users_count_label = QLabel()
+        users_header_layout.addWidget(self.users_count_label)
+        users_header_layout.addStretch()
+        
         load_db_button = QPushButton("Загрузить из БД")
         load_db_button.clicked.connect(self.load_users_from_db)
         users_header_layout.addWidget(load_db_button)
         
+        import_file_button = QPushButton("Импорт из файла")
+        import_file_button.clicked.connect(self.import_excel)
+        users_header_layout.addWidget(import_file_button)
+        
+        export_button = QPushButton("Экспорт")
+        export_button.clicked.connect(self.export_to_excel)
+        users_header_layout.addWidget(export_button)
+        
         layout.addLayout(users_header_layout)
 
-        self.users_input = QTextEdit()
-        self.users_input.setPlaceholderText("Введите список пользователей (по одному на строку)")
-        layout.addWidget(self.users_input)
+        # Модель создается после открытия базы, см. setup_user_list
+        self.users_view = QListView()
+        self.users_view.setUniformItemSizes(True)
+        layout.addWidget(self.users_view)
+        
+        add_users_layout = QHBoxLayout()
+        self.users_input = QLineEdit()
+        self.users_input.setPlaceholderText("Добавить пользователей (через пробел или запятую)")
+        self.users_input.returnPressed.connect(self.add_users_from_input)
+        add_users_button = QPushButton("Добавить")
+        add_users_button.clicked.connect(self.add_users_from_input)
+        clear_users_button = QPushButton("Очистить очередь")
+        clear_users_button.clicked.connect(self.clear_pending_users)
+        add_users_layout.addWidget(self.users_input)
+        add_users_layout.addWidget(add_users_button)
+        add_users_layout.addWidget(clear_users_button)
+        layout.addLayout(add_users_layout)
 
         # Прогресс
         self.progress_bar = QProgressBar()
         layout.addWidget(self.progress_bar)
+        self.run_state_label = QLabel()
+        layout.addWidget(self.run_state_label)
+        self.run_state_timer = QTimer(self)
+        self.run_state_timer.setInterval(250)
+        self.run_state_timer.timeout.connect(self.update_run_state)
 
         # Лог
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+        self.log_text = LogView(os.path.join('data', 'invite.log'))
         layout.addWidget(QLabel("Лог:"))
         layout.addWidget(self.log_text)
 
@@ -653,6 +2350,121 @@ class MainWindow(QMainWindow):
         buttons_layout.addWidget(self.save_button)
         layout.addLayout(buttons_layout)
 
+    def setup_stats_tab(self):
+        """Настройка вкладки статистики по базе пользователей"""
+        layout = QVBoxLayout(self.stats_tab)
+        
+        header_layout = QHBoxLayout()
+        self.stats_summary_label = QLabel()
+        header_layout.addWidget(self.stats_summary_label)
+        header_layout.addStretch()
+        refresh_button = QPushButton("Пересчитать")
+        refresh_button.clicked.connect(self.rebuild_stats)
+        header_layout.addWidget(refresh_button)
+        layout.addLayout(header_layout)
+        
+        layout.addWidget(QLabel("По статусу и каналу:"))
+        self.status_table = QTableWidget(0, 3)
+        self.status_table.setHorizontalHeaderLabels(["Статус", "Канал", "Количество"])
+        self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.status_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.status_table)
+        
+        layout.addWidget(QLabel("Последнее изменение статуса по дням:"))
+        self.daily_table = QTableWidget(0, 5)
+        self.daily_table.setHorizontalHeaderLabels(["Дата", "Приглашены", "Пропущены", "Ошибки", "Всего"])
+        self.daily_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.daily_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.daily_table)
+        
+        # Пока вкладка открыта, сводка обновляется сама; без изменений в базе запросов нет
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(5000)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_timer.start()
+
+    def rebuild_stats(self):
+        """Полный пересчет агрегатов по кнопке (например, после правки базы сторонней программой)"""
+        try:
+            self.db.rebuild_stats()
+        except Exception as e:
+            self.log_message(f"❌ Ошибка при пересчете статистики: {str(e)}")
+            return
+        self.refresh_stats(force=True)
+
+    def refresh_stats(self, force=False):
+        """Обновление вкладки статистики, если она открыта"""
+        if self.tab_widget.currentWidget() is not self.stats_tab or not hasattr(self, 'user_stats'):
+            return
+        try:
+            if not self.user_stats.refresh(force=force):
+                return
+        except Exception as e:
+            self.log_message(f"❌ Ошибка при обновлении статистики: {str(e)}")
+            return
+        
+        stats = self.user_stats
+        titles = dict((status, title) for title, status in self.USER_STATUS_FILTERS if status)
+        summary = ', '.join(f"{titles.get(status, status or '—').lower()}: {count}"
+                            for status, count in stats.by_status.most_common())
+        self.stats_summary_label.setText(f"Всего: {stats.total}" + (f" ({summary})" if summary else ""))
+        
+        self.status_table.setRowCount(len(stats.by_status_channel))
+        for row, (status, channel, count) in enumerate(
+                sorted(stats.by_status_channel, key=lambda item: -item[2])):
+            for column, value in enumerate((titles.get(status, status or '—'), channel or '—', str(count))):
+                self.status_table.setItem(row, column, QTableWidgetItem(value))
+        
+        days = sorted(stats.by_day, reverse=True)[:30]
+        self.daily_table.setRowCount(len(days))
+        for row, day in enumerate(days):
+            counts = stats.by_day[day]
+            values = (day, counts['invited'], counts['skipped'], counts['failed'], sum(counts.values()))
+            for column, value in enumerate(values):
+                self.daily_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def setup_user_list(self):
+        """Подключение списка пользователей к базе"""
+        self.user_model = UserListModel(self.db, parent=self)
+        self.user_model.set_status_filter(self.status_filter_combo.currentData())
+        self.users_view.setModel(self.user_model)
+        self.update_users_count()
+
+    def update_users_count(self):
+        self.users_count_label.setText(f"Записей: {self.user_model.rowCount()}")
+
+    def on_status_filter_changed(self, index):
+        self.user_model.set_status_filter(self.status_filter_combo.itemData(index))
+        self.update_users_count()
+
+    def add_users_from_input(self):
+        """Добавление пользователей, введенных вручную"""
+        values = self.users_input.text().replace(',', ' ').split()
+        if not values:
+            return
+        # Ввод короткий - построчный canonical() без pandas, чтобы не замораживать окно импортом
+        users = list(dict.fromkeys(filter(None, map(UsernameNormalizer.canonical, values))))
+        added = self.db.add_users(users)
+        self.users_input.clear()
+        skipped = len(values) - added
+        details = f", пропущено: {skipped} (некорректные или уже в базе)" if skipped else ""
+        self.log_message(f"✅ Добавлено пользователей: {added}{details}")
+        self.refresh_user_list()
+
+    def clear_pending_users(self):
+        """Удаление пользователей, ожидающих приглашения"""
+        reply = QMessageBox.question(
+            self,
+            'Подтверждение',
+            'Удалить всех пользователей, ожидающих приглашения?',
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            deleted = self.db.delete_users('pending')
+            self.log_message(f"🗑️ Удалено из очереди: {deleted}")
+            self.refresh_user_list()
+
     def setup_check_tab(self):
         """Настройка вкладки проверки аккаунтов"""
         layout = QVBoxLayout(self.check_tab)
@@ -690,8 +2502,7 @@ class MainWindow(QMainWindow):
         layout.addLayout(buttons_layout)
         
         # Лог проверки
-        self.check_log = QTextEdit()
-        self.check_log.setReadOnly(True)
+        self.check_log = LogView(os.path.join('data', 'check.log'))
         layout.addWidget(QLabel("Результаты проверки:"))
         layout.addWidget(self.check_log)
 
@@ -740,7 +2551,7 @@ class MainWindow(QMainWindow):
         self.check_log.append("Начинаем проверку аккаунтов...")
         
         # Создаем и запускаем worker
-        self.check_worker = CheckAccountsWorker(accounts)
+        self.check_worker = CheckAccountsWorker(accounts, self.config_store)
         self.check_worker.log_signal.connect(self.check_log.append)
         self.check_worker.show_dialog_signal.connect(self.show_restore_dialog)
         self.check_worker.start()
@@ -765,101 +2576,108 @@ class MainWindow(QMainWindow):
             self.delete_session_files(account)
 
     def restore_session(self, account):
-        """Восстановление сессии"""
+        """Восстановление сессии (сетевые шаги идут через TelegramCall, окно не блокируется)"""
         try:
-            # Удаляем старые файлы сессии
-            session_file = os.path.join('sessions', f"{account}.session")
-            journal_file = os.path.join('sessions', f"{account}.session-journal")
-            
-            if os.path.exists(session_file):
-                os.remove(session_file)
-            if os.path.exists(journal_file):
-                os.remove(journal_file)
-            
-            # Загружаем конфигурацию
-            config_file = os.path.join('configs', f"{account}.json")
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                api_id = config['telegram_api']['api_id']
-                api_hash = config['telegram_api']['api_hash']
-            
-            phone = account
-            if not phone.startswith('+'):
-                phone = '+' + phone
-            
-            self.log_signal.emit(f"📱 Используем номер: {phone}")
-            
-            # Создаем новый клиент
-            client = TelegramClient(session_file, api_id, api_hash)
-            
-            async def auth_process():
-                try:
-                    await client.connect()
-                    
-                    # Отправляем код
-                    self.log_signal.emit("📤 Отправка кода подтверждения...")
-                    send_code = await client.send_code_request(phone)
-                    
-                    code, ok = QInputDialog.getText(
-                        None,
-                        "Подтверждение",
-                        "Введите код из Telegram:"
-                    )
-                    
-                    if not ok or not code:
-                        return False
-                        
-                    try:
-                        await client.sign_in(phone=phone, code=code)
-                        self.log_signal.emit("✅ Успешная авторизация!")
-                        return True
-                        
-                    except SessionPasswordNeededError:
-                        password, ok = QInputDialog.getText(
-                            None,
-                            "2FA",
-                            "Введите пароль двухфакторной аутентификации:",
-                            QLineEdit.Password
-                        )
-                        if ok and password:
-                            await client.sign_in(password=password)
-                            self.log_signal.emit("✅ Успешная авторизация с 2FA!")
-                            return True
-                        return False
-                        
-                finally:
-                    if client.is_connected():
-                        await client.disconnect()
-            
-            # Создаем и запускаем event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            success = loop.run_until_complete(auth_process())
-            loop.close()
-            
-            if success:
-                self.log_signal.emit("✅ Сессия успешно восстановлена")
-                # Перезапускаем проверку аккаунта
-                self.check_accounts([account])
-                
+            # Загружаем конфигурацию до удаления старой сессии
+            settings = self.config_store.get_session_settings(account)
+            if settings is None:
+                raise FileNotFoundError(f"не найден конфиг для {account}")
+            api_id = int(settings['api_id'])
+            api_hash = settings['api_hash']
         except Exception as e:
-            self.log_signal.emit(f"❌ Ошибка при восстановлении сессии: {str(e)}")
-            import traceback
-            self.log_signal.emit(f"Детали ошибки:\n{traceback.format_exc()}")
+            self.check_log.append(f"❌ Ошибка при восстановлении сессии: {str(e)}")
+            return
+        
+        phone = account
+        if not phone.startswith('+'):
+            phone = '+' + phone
+        self.check_log.append(f"📱 Используем номер: {phone}")
+        session_file = self.session_registry.session_path(account)
+        
+        def on_error(error):
+            self.check_log.append(f"❌ Ошибка при восстановлении сессии: {str(error)}")
+        
+        def on_dropped(_):
+            # Старые файлы сессии удаляем после отключения клиента
+            try:
+                self.session_registry.remove_session_files(account)
+            except Exception as e:
+                on_error(e)
+                return
+            self.authorize_session(session_file, api_id, api_hash, phone, self.check_log.append, on_restored)
+        
+        def on_restored():
+            self.check_log.append("✅ Сессия успешно восстановлена")
+            # Перезапускаем проверку аккаунта
+            self.check_accounts([account])
+        
+        TelegramCall(TELEGRAM_LOOP.drop_client(session_file), on_dropped, on_error, parent=self)
+    
+    def authorize_session(self, session_file, api_id, api_hash, phone, log, on_success):
+        """Вход по коду из Telegram (и паролю 2FA): сетевые шаги в общем loop с таймаутом,
+        диалоги - в потоке интерфейса между шагами"""
+        errors = lazy_import('telethon.errors')
+        client = None
+        
+        def release():
+            nonlocal client
+            if client is not None:
+                TELEGRAM_LOOP.submit(TELEGRAM_LOOP.release_client(client))
+                client = None
+        
+        def fail(error):
+            log(f"❌ Ошибка при авторизации: {str(error)}")
+            release()
+        
+        def cancel():
+            log("⚠️ Авторизация отменена")
+            release()
+        
+        def succeed(message):
+            log(message)
+            release()
+            on_success()
+        
+        def on_connected(connected):
+            nonlocal client
+            client = connected
+            log("📤 Отправка кода подтверждения...")
+            TelegramCall(client.send_code_request(phone), ask_code, fail, parent=self)
+        
+        def ask_code(_):
+            code, ok = QInputDialog.getText(self, "Подтверждение", "Введите код, полученный в Telegram:")
+            if not (ok and code):
+                cancel()
+                return
+            TelegramCall(client.sign_in(phone=phone, code=code),
+                         lambda _: succeed("✅ Успешная авторизация!"), on_code_error, parent=self)
+        
+        def on_code_error(error):
+            if not isinstance(error, errors.SessionPasswordNeededError):
+                fail(error)
+                return
+            # Если требуется двухфакторная аутентификация
+            password, ok = QInputDialog.getText(
+                self,
+                "Двухфакторная аутентификация",
+                "Введите пароль двухфакторной аутентификации:",
+                QLineEdit.Password
+            )
+            if not (ok and password):
+                cancel()
+                return
+            TelegramCall(client.sign_in(password=password),
+                         lambda _: succeed("✅ Успешная авторизация с 2FA!"), fail, parent=self)
+        
+        TelegramCall(TELEGRAM_LOOP.acquire_client(session_file, api_id, api_hash), on_connected, fail, parent=self)
 
     def delete_session_files(self, account):
         """Удаление файлов сессии"""
         try:
-            session_path = os.path.join('sessions', f"{account}.session")
-            journal_path = os.path.join('sessions', f"{account}.session-journal")
-            config_path = os.path.join('configs', f"{account}.json")
-            
-            if os.path.exists(session_path):
-                os.remove(session_path)
-            if os.path.exists(journal_path):
-                os.remove(journal_path)
-            if os.path.exists(config_path):
-                os.remove(config_path)
+            TELEGRAM_LOOP.run(TELEGRAM_LOOP.drop_client(self.session_registry.session_path(account)),
+                              TELEGRAM_CALL_TIMEOUT)
+            self.session_registry.remove_session_files(account)
+            self.config_store.delete(account)
             
             self.check_log.append(f"🗑️ Сессия {account} успешно удалена")
             
@@ -872,15 +2690,9 @@ class MainWindow(QMainWindow):
 
     def load_sessions(self):
         """Загрузка списка существующих сессий"""
-        # Ищем все файлы .session в папке sessions
-        session_files = [f for f in os.listdir('sessions') 
-                        if f.endswith('.session') and not f.endswith('.session-journal')]
-        self.sessions = []
-        
-        for session_file in session_files:
-            # Извлекаем номер телефона из имени файла
-            phone = session_file.replace('.session', '')
-            self.sessions.append(phone)
+        # Индекс пересканирует папку sessions только если она изменилась
+        self.session_registry.refresh()
+        self.sessions = self.session_registry.names()
         
         # Очищаем временные файлы
         self.cleanup_temp_files()
@@ -905,21 +2717,14 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.log_message(f"❌ Ошибка при очистке временных файлов: {str(e)}")
 
+    @PROFILER.timed('ui.log_message')
     def log_message(self, message):
         self.log_text.append(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
 
     def read_session_info(self, session_file):
         """Чтение информации из файла конфигурации сессии"""
         try:
-            config_file = os.path.join('configs', session_file)
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                api_data = config_data.get('telegram_api', {})
-                return {
-                    'api_id': api_data.get('api_id', ''),
-                    'api_hash': api_data.get('api_hash', ''),
-                    'phone': api_data.get('phone', '')
-                }
+            return self.config_store.get_session_settings(os.path.splitext(session_file)[0])
         except Exception as e:
             self.log_message(f"❌ Ошибка при чтении файла конфигурации: {str(e)}")
             return None
@@ -927,56 +2732,27 @@ class MainWindow(QMainWindow):
     def on_session_changed(self, session):
         """Обработчик смены сессии"""
         if session:
-            # Сначала перемещаем файлы сессии если они в корневой папке
-            session_file = f"{session}.session"
-            journal_file = f"{session}.session-journal"
-            
-            if os.path.exists(session_file):
-                try:
-                    shutil.move(session_file, os.path.join('sessions', session_file))
-                    self.log_text.append(f"✅ Файл сессии {session_file} перемещен в папку sessions")
-                except Exception as e:
-                    self.log_text.append(f"❌ Ошибка при перемещении файла сессии: {str(e)}")
-            
-            if os.path.exists(journal_file):
-                try:
-                    shutil.move(journal_file, os.path.join('sessions', journal_file))
-                except Exception as e:
-                    self.log_text.append(f"❌ Ошибка при перемещении файла журнала: {str(e)}")
-            
             # Загружаем конфигурацию
-            config_file = os.path.join('configs', f"{session}.json")
             self.log_text.append(f"🔄 Загрузка настроек из файла {session}.json")
             
             try:
-                if not os.path.exists(config_file):
+                settings = self.config_store.get_session_settings(session)
+                if settings is None:
                     self.log_text.append(f"❌ Файл {session}.json не существует")
                     return
+                
+                api_id = settings['api_id']
+                api_hash = settings['api_hash']
+                if api_id and api_hash:
+                    self.log_text.append(f"📱 Найдены данные API - ID: {api_id}, Hash: {api_hash}")
                     
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-                    
-                    # Пробуем сначала новый формат
-                    api_data = config_data.get('telegram_api', {})
-                    
-                    if api_data:
-                        api_id = str(api_data.get('api_id', ''))
-                        api_hash = api_data.get('api_hash', '')
-                    else:
-                        # Если нет секции telegram_api, пробуем старый формат
-                        api_id = str(config_data.get('app_id', ''))
-                        api_hash = config_data.get('app_hash', '')
+                    self.api_id_input.setText(api_id)
+                    self.api_hash_input.setText(api_hash)
+                    self.phone_input.setText(session)
                     
-                    if api_id and api_hash:
-                        self.log_text.append(f"📱 Найдены данные API - ID: {api_id}, Hash: {api_hash}")
-                        
-                        self.api_id_input.setText(api_id)
-                        self.api_hash_input.setText(api_hash)
-                        self.phone_input.setText(session)
-                        
-                        self.log_text.append(f"✅ Успешно загружены настройки для сессии {session}")
-                    else:
-                        self.log_text.append("❌ Не найдены API ID и Hash в файле конфигурации")
+                    self.log_text.append(f"✅ Успешно загружены настройки для сессии {session}")
+                else:
+                    self.log_text.append("❌ Не найдены API ID и Hash в файле конфигурации")
                     
             except Exception as e:
                 self.log_text.append(f"❌ Ошибка при загрузке настроек: {str(e)}")
@@ -996,9 +2772,7 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.Yes:
                 try:
                     # Удаляем файл конфигурации сессии
-                    config_file = f"{current_session}.json"
-                    if os.path.exists(config_file):
-                        os.remove(config_file)
+                    self.config_store.delete(current_session)
                     
                     self.log_message(f"✅ Сессия {current_session} удалена")
                     self.refresh_sessions()
@@ -1011,53 +2785,39 @@ class MainWindow(QMainWindow):
             api_hash = self.api_hash_input.text().strip()
             phone = self.phone_input.text().strip()
             channel_link = self.channel_input.text().strip()
-            users = [u.strip() for u in self.users_input.toPlainText().split('\n') if u.strip()]
+            users_count = self.db.count_users('pending')
 
-            if not all([api_id, api_hash, phone, channel_link, users]):
+            if not all([api_id, api_hash, phone, channel_link, users_count]):
                 QMessageBox.warning(self, "Ошибка", "Пожалуйста, заполните все поля")
                 return
 
             # Сохраняем настройки перед началом работы
             self.save_config()
 
-            # Создаем и проверяем клиента перед созданием worker'а
-            session_file = os.path.join('sessions', phone)
-            try:
-                client = TelegramClient(session_file, api_id, api_hash)
-                # Пробуем подключиться для проверки
-                client.connect()
-                if not client.is_user_authorized():
-                    QMessageBox.warning(self, "Ошибка", "Сессия не авторизована. Пожалуйста, проверьте файл сессии.")
-                    client.disconnect()
-                    return
-                client.disconnect()
-                self.log_text.append("✅ Проверка сессии успешна")
-            except Exception as e:
-                self.log_text.append(f"❌ Ошибка при проверке сессии: {str(e)}")
-                QMessageBox.warning(self, "Ошибка", f"Не удалось создать клиент Telegram: {str(e)}")
-                return
-
-            # Если проверка прошла успешно, создаем worker
+            # Сессия проверяется в потоке worker'а, подключенный клиент используется для работы
             self.worker = TelegramWorker(
                 api_id=api_id,
                 api_hash=api_hash,
                 phone=phone,
                 channel_link=channel_link,
-                users=users,
+                db=self.db,
                 users_per_batch=10,
-                batch_delay=300
+                batch_delay=300,
+                session_file=self.session_registry.session_path(phone)
             )
             
             self.worker.update_log.connect(self.log_message)
-            self.worker.update_progress.connect(self.progress_bar.setValue)
             self.worker.auth_code_required.connect(self.request_auth_code)
             self.worker.password_required.connect(self.request_password)
+            self.worker.session_validated.connect(self.on_session_validated)
             self.worker.finished_signal.connect(self.on_invite_finished)
             
             self.start_button.setEnabled(False)
             self.stop_button.setEnabled(True)
             self.progress_bar.setValue(0)
+            self.run_state_label.setText("⏳ Проверка сессии...")
             self.worker.start()
+            self.run_state_timer.start()
 
         except ValueError as e:
             QMessageBox.warning(self, "Ошибка", "Проверьте правильность введенных данных")
@@ -1068,8 +2828,28 @@ class MainWindow(QMainWindow):
         if self.worker:
             self.worker.stop()
             self.stop_button.setEnabled(False)
-            # Ждем завершения потока
-            self.worker.wait()
+            # Не ждем поток: кнопки вернутся в on_invite_finished, фазу покажет update_run_state
+
+    @PROFILER.timed('ui.run_state')
+    def update_run_state(self):
+        """Опрос состояния прогона: прогресс, счетчики, фаза и оценка оставшегося времени"""
+        if not self.worker:
+            return
+        state = self.worker.state.snapshot()
+        self.progress_bar.setValue(state.progress)
+        text = state.phase_title
+        if state.phase_left is not None:
+            text += f" (еще {int(state.phase_left)} с)"
+        if state.total:
+            text += (f" · {state.processed}/{state.total}"
+                     f" · ✅ {state.invited} ⏭️ {state.skipped} ❌ {state.failed}")
+        if state.eta is not None:
+            text += f" · осталось ~{timedelta(seconds=int(state.eta))}"
+        self.run_state_label.setText(text)
+
+    def on_session_validated(self, ok, message):
+        if not ok:
+            QMessageBox.warning(self, "Ошибка", message)
 
     def request_auth_code(self):
         code, ok = QInputDialog.getText(
@@ -1093,22 +2873,46 @@ class MainWindow(QMainWindow):
 
     def on_invite_finished(self, results):
         success, failed = results
+        self.run_state_timer.stop()
+        self.update_run_state()
         self.log_message(f"✨ Процесс завершен! Успешно: {success}, Неудачно: {failed}")
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
+        self.refresh_user_list()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            STARTUP.mark('first_paint')
+            STARTUP.report()
 
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
         if self.worker and self.worker.isRunning():
             self.worker.stop()
             self.worker.wait()
+        if self.import_worker and self.import_worker.isRunning():
+            self.import_worker.stop()
+            self.import_worker.wait()
+        if self.merge_worker and self.merge_worker.isRunning():
+            self.merge_worker.stop()
+            self.merge_worker.wait()
+        if self.export_worker and self.export_worker.isRunning():
+            self.export_worker.stop()
+            self.export_worker.wait()
+        self.log_text.flush()
+        self.check_log.flush()
+        self.db.close()
+        TELEGRAM_LOOP.shutdown()
         event.accept()
 
     def refresh_sessions(self):
         """Обновление списка сессий"""
         current = self.session_combo.currentText()
         
-        # Обновляем список сессий
+        # Подбираем файлы, положенные в рабочую папку, и обновляем список сессий
+        self.cleanup_root_directory()
         self.load_sessions()
         
         # Обновляем комбобокс
@@ -1124,75 +2928,9 @@ class MainWindow(QMainWindow):
             
         self.log_message(f"🔄 Список сессий обновлен. Найдено: {len(self.sessions)}")
 
-    def load_users_from_file(self):
-        try:
-            with open('users.txt', 'r', encoding='utf-8') as f:
-                users = f.read()
-            self.users_input.setText(users)
-            self.log_message("✅ Список пользователей успешно загружен из файла users.txt")
-        except FileNotFoundError:
-            self.log_message("❌ Файл users.txt не найден")
-        except Exception as e:
-            self.log_message(f"❌ Ошибка при загрузке списка пользователей: {str(e)}")
-
-    def save_users_to_file(self):
-        try:
-            users = self.users_input.toPlainText()
-            with open('users.txt', 'w', encoding='utf-8') as f:
-                f.write(users)
-            self.log_message("✅ Список пользователей сохранен в файл users.txt")
-        except Exception as e:
-            self.log_message(f"❌ Ошибка при сохранении списка пользователей: {str(e)}")
-
-    def load_config(self):
-        try:
-            # Загружаем общие настройки
-            with open('config.json', 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-            
-            # Загружаем настройки для текущей сессии
-            current_session = self.session_combo.currentText()
-            if current_session:
-                config_file = f"{current_session}.json"
-                if os.path.exists(config_file):
-                    try:
-                        with open(config_file, 'r', encoding='utf-8') as f:
-                            session_config = json.load(f)
-                            
-                            # Загружаем настройки API для этой сессии
-                            api_settings = session_config.get('telegram_api', {})
-                            self.api_id_input.setText(str(api_settings.get('api_id', '')))
-                            self.api_hash_input.setText(api_settings.get('api_hash', ''))
-                            self.phone_input.setText(current_session)  # Используем номер из имени файла
-                            
-                            # Загружаем настройки канала
-                            channel_settings = session_config.get('channel_settings', {})
-                            self.channel_input.setText(str(channel_settings.get('channel_link', '')))
-                            
-                            self.log_message(f"✅ Загружены настройки для сессии {current_session}")
-                    except Exception as e:
-                        self.log_message(f"❌ Ошибка при загрузке настроек сессии: {str(e)}")
-                else:
-                    self.log_message(f"❌ Файл настроек {config_file} не найден")
-                    # Очищаем поля, так как настройки не найдены
-                    self.api_id_input.clear()
-                    self.api_hash_input.clear()
-                    self.phone_input.setText(current_session)
-                    self.channel_input.clear()
-            
-            # Пробуем загрузить пользователей из отдельного файла
-            self.load_users_from_file()
-                
-        except FileNotFoundError:
-            self.log_message("Файл конфигурации не найден. Будет создан новый при сохранении.")
-            self.config = {}
-        except Exception as e:
-            self.log_message(f"Ошибка при загрузке конфигурации: {str(e)}")
-            self.config = {}
-
     def save_config(self):
         try:
-            # Сохраняем общие настройки
+            # Сохраняем общие настройки (файл не перезаписывается, если ничего не изменилось)
             config = {
                 'invite_settings': {
                     'users_per_batch': 10,
@@ -1201,11 +2939,7 @@ class MainWindow(QMainWindow):
                     'max_retries': 3
                 }
             }
-            
-            # Сохраняем основной конфиг сразу в папку configs
-            config_path = os.path.join('configs', 'config.json')
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
+            self.config_store.save('config', config)
             
             # Сохраняем настройки для текущей сессии
             phone = self.phone_input.text()
@@ -1214,74 +2948,78 @@ class MainWindow(QMainWindow):
                 api_hash = self.api_hash_input.text().strip()
                 channel_link = self.channel_input.text().strip()
                 
-                self.log_message(f"💾 Сохранение настроек для сессии {phone}")
-                
-                session_config = {
-                    'telegram_api': {
-                        'api_id': api_id,
-                        'api_hash': api_hash,
-                        'phone': phone
-                    },
-                    'channel_settings': {
-                        'channel_link': channel_link
-                    }
-                }
-                
-                # Сохраняем файл сессии сразу в папку configs
-                session_config_file = os.path.join('configs', f"{phone}.json")
-                with open(session_config_file, 'w', encoding='utf-8') as f:
-                    json.dump(session_config, f, indent=4, ensure_ascii=False)
-                
-                self.log_message(f"✅ Настройки сохранены в файл {session_config_file}")
+                if self.config_store.save_session_settings(phone, api_id, api_hash, phone, channel_link):
+                    self.log_message(f"✅ Настройки сохранены в файл {self.config_store.path(phone)}")
         
         except Exception as e:
             self.log_message(f"❌ Ошибка при сохранении настроек: {str(e)}")
 
     def import_from_excel(self, file_path):
-        try:
-            df = pd.read_excel(file_path)
-            if 'username' not in df.columns:
-                raise ValueError("Excel файл должен содержать колонку 'username'")
-            
-            for username in df['username']:
-                self.db.add_user(str(username).strip())
-            
-            self.log_message(f"✅ Импортировано {len(df)} пользователей из Excel")
-            return True
-        except Exception as e:
-            self.log_message(f"❌ Ошибка при импорте из Excel: {str(e)}")
+        """Запуск фонового импорта пользователей из xlsx/csv/txt"""
+        if self.import_worker and self.import_worker.isRunning():
+            QMessageBox.warning(self, "Предупреждение", "Импорт уже выполняется")
             return False
+        
+        self.import_worker = ImportWorker(self.db, file_path)
+        self.import_worker.update_log.connect(self.log_message)
+        self.import_worker.update_progress.connect(self.progress_bar.setValue)
+        self.import_worker.finished_signal.connect(self.on_import_finished)
+        self.progress_bar.setValue(0)
+        self.import_worker.start()
+        return True
+    
+    def on_import_finished(self, results):
+        self.refresh_user_list()
 
     def export_to_excel(self):
-        try:
-            conn = sqlite3.connect(self.db.db_path)
-            df = pd.read_sql_query('SELECT * FROM users', conn)
-            conn.close()
-            
-            export_path = os.path.join('data', f'users_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
-            df.to_excel(export_path, index=False)
-            self.log_message(f"✅ Данные экспортированы в {export_path}")
-            return True
-        except Exception as e:
-            self.log_message(f"❌ Ошибка при экспорте в Excel: {str(e)}")
+        """Фоновый экспорт пользователей в xlsx/csv/parquet с фильтрами"""
+        if self.export_worker and self.export_worker.isRunning():
+            QMessageBox.warning(self, "Предупреждение", "Экспорт уже выполняется")
+            return False
+        
+        dialog = ExportDialog(self.USER_STATUS_FILTERS, self)
+        if dialog.exec() != QDialog.Accepted:
+            return False
+        
+        extension = dialog.extension()
+        default_path = os.path.join('data', f'users_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}{extension}')
+        export_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Сохранить экспорт",
+            default_path,
+            dict((ext, title) for title, ext in ExportDialog.FORMATS)[extension]
+        )
+        if not export_path:
             return False
+        if not export_path.lower().endswith(extension):
+            export_path += extension
+        
+        self.export_worker = ExportWorker(self.db, export_path, dialog.filters())
+        self.export_worker.update_log.connect(self.log_message)
+        self.export_worker.update_progress.connect(self.progress_bar.setValue)
+        self.progress_bar.setValue(0)
+        self.export_worker.start()
+        return True
 
     def import_excel(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self,
-            "Выберите Excel файл",
+            "Выберите файл со списком пользователей",
             "",
-            "Excel Files (*.xlsx *.xls)"
+            "Файлы пользователей (*.xlsx *.xls *.csv *.txt);;Все файлы (*.*)"
         )
         if file_path:
-            if self.import_from_excel(file_path):
-                self.refresh_user_list()
+            self.import_from_excel(file_path)
 
     def refresh_user_list(self):
-        users = self.db.get_pending_users()
-        self.users_input.setText('\n'.join(users))
+        self.user_model.refresh()
+        self.update_users_count()
 
     def load_users_from_db(self):
+        """Фоновое слияние ожидающих пользователей из другой базы в data/users.db"""
+        if self.merge_worker and self.merge_worker.isRunning():
+            QMessageBox.warning(self, "Предупреждение", "Загрузка из БД уже выполняется")
+            return
         try:
             # Открываем диалог выбора файла базы данных
             file_path, _ = QFileDialog.getOpenFileName(
@@ -1294,42 +3032,27 @@ class MainWindow(QMainWindow):
             if not file_path:  # Если пользователь отменил выбор
                 return
             
-            conn = sqlite3.connect(file_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT username FROM users WHERE status = 'pending'")
-            users = cursor.fetchall()
-            
-            # Очищаем текущий список
-            self.users_input.clear()
-            
-            # Добавляем пользователей в список
-            users_text = []
-            for user in users:
-                username = user[0].strip('@') if user[0].startswith('@') else user[0]
-                users_text.append(username)
-            
-            # Устанавливаем текст в QTextEdit
-            self.users_input.setText('\n'.join(users_text))
+            if os.path.abspath(file_path) == os.path.abspath(self.db.db_path):
+                QMessageBox.warning(self, "Предупреждение", "Выбрана текущая база данных")
+                return
             
-            self.log_text.append(f"Загружено {len(users)} пользователей из базы данных")
+            self.merge_worker = MergeWorker(self.db, file_path)
+            self.merge_worker.update_log.connect(self.log_message)
+            self.merge_worker.update_progress.connect(self.progress_bar.setValue)
+            self.merge_worker.finished_signal.connect(self.on_import_finished)
+            self.progress_bar.setValue(0)
+            self.merge_worker.start()
             
         except Exception as e:
             self.log_text.append(f"Ошибка при загрузке из БД: {str(e)}")
             QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить данные: {str(e)}")
-        finally:
-            if 'conn' in locals():
-                conn.close()
 
     def delete_invalid_session(self, account):
         """Удаление неработающей сессии"""
         try:
-            session_file = os.path.join('sessions', f"{account}.session")
-            journal_file = os.path.join('sessions', f"{account}.session-journal")
-            
-            if os.path.exists(session_file):
-                os.remove(session_file)
-            if os.path.exists(journal_file):
-                os.remove(journal_file)
+            TELEGRAM_LOOP.run(TELEGRAM_LOOP.drop_client(self.session_registry.session_path(account)),
+                              TELEGRAM_CALL_TIMEOUT)
+            self.session_registry.remove_session_files(account)
             
             self.check_log.append(f"🗑️ Удалена неработающая сессия {account}")
             return True
@@ -1365,71 +3088,12 @@ class MainWindow(QMainWindow):
             if not ok or not api_hash:
                 return
 
-            # Создаем клиента
-            session_file = os.path.join('sessions', phone)
-            client = TelegramClient(session_file, int(api_id), api_hash)
+            session_file = self.session_registry.session_path(phone)
+            phone_clean = phone.replace('+', '').strip()
             
-            async def auth_process():
-                await client.connect()
-                
-                # Отправляем код подтверждения
-                self.log_message("📤 Отправка кода подтверждения...")
-                phone_clean = phone.replace('+', '').strip()
-                send_code = await client.send_code_request(phone_clean)
-                
-                # Запрашиваем код у пользователя
-                code, ok = QInputDialog.getText(
-                    self,
-                    "Подтверждение",
-                    "Введите код, полученный в Telegram:"
-                )
-                if not ok or not code:
-                    await client.disconnect()
-                    return False
-                
-                try:
-                    # Пытаемся войти с полученным кодом
-                    await client.sign_in(phone=phone_clean, code=code)
-                    self.log_message("✅ Успешная авторизация!")
-                    return True
-                    
-                except SessionPasswordNeededError:
-                    # Если требуется двухфакторная аутентификация
-                    password, ok = QInputDialog.getText(
-                        self,
-                        "Двухфакторная аутентификация",
-                        "Введите пароль двухфакторной аутентификации:",
-                        QLineEdit.Password
-                    )
-                    if ok and password:
-                        await client.sign_in(password=password)
-                        self.log_message("✅ Успешная авторизация с 2FA!")
-                        return True
-                    return False
-                    
-                except Exception as e:
-                    self.log_message(f"❌ Ошибка при авторизации: {str(e)}")
-                    return False
-            
-            # Создаем и запускаем event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            success = loop.run_until_complete(auth_process())
-            loop.close()
-            
-            if success:
+            def on_authorized():
                 # Сохраняем конфигурацию
-                config = {
-                    'telegram_api': {
-                        'api_id': api_id,
-                        'api_hash': api_hash,
-                        'phone': phone
-                    }
-                }
-                
-                config_file = os.path.join('configs', f"{phone}.json")
-                with open(config_file, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, indent=4, ensure_ascii=False)
+                self.config_store.save_session_settings(phone, api_id, api_hash, phone)
                 
                 self.log_message("✅ Сессия успешно создана и сохранена")
                 
@@ -1439,13 +3103,16 @@ class MainWindow(QMainWindow):
                 # Выбираем новую сессию
                 self.session_combo.setCurrentText(phone)
             
+            self.authorize_session(session_file, int(api_id), api_hash, phone_clean, self.log_message, on_authorized)
+            
         except Exception as e:
             self.log_message(f"❌ Ошибка при создании сессии: {str(e)}")
-            if 'client' in locals():
-                client.disconnect()
 
 if __name__ == '__main__':
+    STARTUP.mark('module_loaded')
     app = QApplication(sys.argv)
+    STARTUP.mark('qapplication_created')
     window = MainWindow()
+    STARTUP.mark('main_window_created')
     window.show()
     sys.exit(app.exec())
\ No newline at end of file